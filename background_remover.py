@@ -1,17 +1,29 @@
 """Background removal module for solid color backgrounds."""
 
+import threading
 import cv2
 import numpy as np
 from PIL import Image
-from config import BACKGROUND_COLORS, COLOR_TOLERANCE
+from config import BACKGROUND_COLORS, COLOR_TOLERANCE, RMBG_METHODS
+from model_registry import ModelRegistry
 
 
 class BackgroundRemover:
     """Handles removal of solid color backgrounds from images."""
 
-    def __init__(self, tolerance=COLOR_TOLERANCE):
+    def __init__(self, tolerance=COLOR_TOLERANCE, registry=None, micro_batch_size=None,
+                 micro_batch_wait_ms=20):
         self.tolerance = tolerance
         self.bg_colors = BACKGROUND_COLORS
+        # Shared AI backends so models are loaded once, not once per image
+        self.registry = registry if registry is not None else ModelRegistry()
+
+        # Optional micro-batching of concurrent RMBG-2.0 requests
+        self.micro_batch_size = micro_batch_size
+        self.micro_batch_wait_ms = micro_batch_wait_ms
+        # One queue per RMBG-2.0 method, each in front of that method's model
+        self.inference_queues = {}
+        self._queue_lock = threading.Lock()
 
     def remove_color_background(self, image, color_name=None, custom_color=None):
         """Remove a solid color background from the image.
@@ -111,33 +123,34 @@ class BackgroundRemover:
 
         Args:
             image: numpy array of the image (BGR format)
-            method: AI method to use - "rembg" or "rmbg" (BRIA RMBG-2.0)
+            method: AI method to use - "rembg", "rmbg" (BRIA RMBG-2.0) or
+                "rmbg-onnx" (RMBG-2.0 on ONNX Runtime)
 
         Returns:
             Image with transparent background (BGRA format)
         """
-        if method == "rmbg":
-            # Use BRIA RMBG-2.0 model
+        if method in RMBG_METHODS:
+            # Use BRIA RMBG-2.0 model (loaded once via the registry)
             try:
-                from rmbg_remover import RMBGRemover
-                remover = RMBGRemover()
-                return remover.remove_background(image)
+                return self._rmbg_backend(method).remove_background(image)
             except ImportError as e:
                 print(f"Warning: RMBG-2.0 dependencies not installed: {e}")
                 print("Falling back to rembg...")
                 method = "rembg"
 
-        # Use rembg (default)
+        # Use rembg (default) with the shared session from the registry
         try:
             from rembg import remove
             from PIL import Image as PILImage
 
+            session = self.registry.get("rembg")
+
             # Convert cv2 image to PIL
             rgb_image = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
             pil_image = PILImage.fromarray(rgb_image)
 
             # Remove background
-            output = remove(pil_image)
+            output = remove(pil_image, session=session)
 
             # Convert back to cv2 format
             result = np.array(output)
@@ -147,3 +160,44 @@ class BackgroundRemover:
         except ImportError:
             print("Warning: rembg not installed. Using color-based removal instead.")
             return self.remove_color_background(image)
+
+    def _rmbg_backend(self, method="rmbg"):
+        """Return the RMBG-2.0 remover, behind a micro-batching queue if enabled."""
+        remover = self.registry.get(method)
+        if not self.micro_batch_size or self.micro_batch_size <= 1:
+            return remover
+
+        inference_queue = self.inference_queues.get(method)
+        if inference_queue is None:
+            from inference_queue import MicroBatchQueue
+            with self._queue_lock:
+                inference_queue = self.inference_queues.get(method)
+                if inference_queue is None:
+                    inference_queue = self.inference_queues[method] = MicroBatchQueue(
+                        remover, max_batch_size=self.micro_batch_size,
+                        max_wait_ms=self.micro_batch_wait_ms)
+        return inference_queue
+
+    def remove_with_ai_batch(self, images, method="rembg", batch_size=8):
+        """Remove backgrounds from several images using an AI method.
+
+        RMBG-2.0 runs the images through batched forward passes of up to
+        `batch_size` images; other methods process them one by one.
+
+        Args:
+            images: List of numpy arrays (BGR format)
+            method: AI method to use - "rembg", "rmbg" (BRIA RMBG-2.0) or
+                "rmbg-onnx" (RMBG-2.0 on ONNX Runtime)
+            batch_size: Maximum number of images per forward pass
+
+        Returns:
+            List of images with transparent background (BGRA format)
+        """
+        if method in RMBG_METHODS:
+            try:
+                remover = self.registry.get(method)
+                return remover.batch_remove_background(images, batch_size=batch_size)
+            except ImportError:
+                pass  # remove_with_ai reports the missing dependency and falls back
+
+        return [self.remove_with_ai(image, method=method) for image in images]
@@ -0,0 +1,435 @@
+#!/usr/bin/env python3
+"""Benchmarks for the image purifier's processing paths.
+
+Usage:
+  python benchmark.py executors --count 48 --size 1920x1080 --workers 4
+  python benchmark.py transport --sizes 3840x2160 7680x4320
+  python benchmark.py backends --backends rmbg rmbg-onnx --count 16
+  python benchmark.py backends --size 640x480 --resolutions 512 768 1024
+  python benchmark.py preprocess --sizes 1920x1080 3840x2160
+  python benchmark.py prefork --workers 4 --backend rmbg
+  python benchmark.py watermark --sizes 1920x1080 7680x4320
+"""
+
+import argparse
+import contextlib
+import gc
+import io
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+
+def parse_size(text):
+    """Parse a WIDTHxHEIGHT string into a (width, height) tuple."""
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def make_synthetic_image(width, height, seed=0):
+    """Create a test image: white background, a subject and a text watermark."""
+    rng = np.random.default_rng(seed)
+    image = np.full((height, width, 3), 255, dtype=np.uint8)
+
+    # Textured subject in the middle so inpainting/keying has real work to do
+    y1, y2 = height // 4, height * 3 // 4
+    x1, x2 = width // 4, width * 3 // 4
+    image[y1:y2, x1:x2] = rng.integers(0, 200, (y2 - y1, x2 - x1, 3), dtype=np.uint8)
+
+    scale = max(0.5, width / 1200)
+    cv2.putText(image, "Gemini", (int(width * 0.78), int(height * 0.95)),
+                cv2.FONT_HERSHEY_SIMPLEX, scale, (60, 60, 60), max(1, int(scale * 2)))
+    return image
+
+
+def make_dataset(directory, count, size, extension=".jpg"):
+    """Write `count` synthetic images of the given size into a directory."""
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    width, height = size
+    for i in range(count):
+        cv2.imwrite(str(directory / f"image_{i:04d}{extension}"),
+                    make_synthetic_image(width, height, seed=i))
+    return directory
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the per-image progress output of the processor."""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def bench_executors(args):
+    """Compare sequential, thread, process and pipeline directory runs."""
+    from image_processor import ImageProcessor
+
+    size = parse_size(args.size)
+    workdir = Path(tempfile.mkdtemp(prefix="purifier_bench_"))
+    try:
+        input_dir = make_dataset(workdir / "input", args.count, size)
+
+        pipelines = {
+            "watermark": {"remove_watermark": True},
+            "watermark+color": {"remove_watermark": True, "remove_background": True,
+                                "bg_color": "white"},
+        }
+        modes = [("sequential", 1, "process")]
+        for workers in args.workers:
+            modes.append((f"thread x{workers}", workers, "thread"))
+            modes.append((f"process x{workers}", workers, "process"))
+            modes.append((f"pipeline x{workers}", workers, "pipeline"))
+
+        print(f"{args.count} images at {size[0]}x{size[1]}, {os.cpu_count()} CPUs\n")
+        print(f"{'pipeline':<18}{'mode':<14}{'seconds':>10}{'img/s':>10}")
+
+        for pipeline_name, options in pipelines.items():
+            for mode_name, workers, executor in modes:
+                output_dir = workdir / "output"
+                shutil.rmtree(output_dir, ignore_errors=True)
+
+                processor = ImageProcessor()
+                start = time.perf_counter()
+                with quiet():
+                    processor.process_directory(input_dir, output_dir, workers=workers,
+                                                executor=executor, **options)
+                elapsed = time.perf_counter() - start
+
+                print(f"{pipeline_name:<18}{mode_name:<14}{elapsed:>10.2f}"
+                      f"{args.count / elapsed:>10.1f}")
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+_bench_ring = None
+
+
+def _attach_bench_ring(spec):
+    global _bench_ring
+    from shm_transport import SharedFrameRing
+    _bench_ring = SharedFrameRing.attach(spec)
+
+
+def _roundtrip_pickle(frame):
+    """Worker side of the pickle benchmark: receive a BGR frame, return BGRA."""
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA)
+
+
+def _roundtrip_shm(handle):
+    """Worker side of the shared memory benchmark: same work, handles only."""
+    frame = _bench_ring.view(handle)
+    return _bench_ring.write(handle.slot, cv2.cvtColor(frame, cv2.COLOR_BGR2BGRA))
+
+
+def bench_transport(args):
+    """Compare pickling frames between processes with shared memory handles."""
+    from concurrent.futures import ProcessPoolExecutor
+    from shm_transport import SharedFrameRing
+
+    print(f"{args.count} BGR->BGRA round trips per size through one worker process\n")
+    print(f"{'size':<12}{'transport':<12}{'ms/frame':>10}{'MB/s':>10}")
+
+    for size_text in args.sizes:
+        width, height = parse_size(size_text)
+        frame = make_synthetic_image(width, height)
+        frame_mb = (frame.nbytes + width * height * 4) / (1024 * 1024)
+
+        with ProcessPoolExecutor(max_workers=1) as pool:
+            pool.submit(_roundtrip_pickle, frame[:8, :8]).result()
+            start = time.perf_counter()
+            for _ in range(args.count):
+                pool.submit(_roundtrip_pickle, frame).result()
+            pickle_time = (time.perf_counter() - start) / args.count
+
+        with SharedFrameRing.create(1, width * height * 4) as ring:
+            with ProcessPoolExecutor(max_workers=1, initializer=_attach_bench_ring,
+                                     initargs=(ring.spec,)) as pool:
+                slot = ring.acquire()
+                start = time.perf_counter()
+                for _ in range(args.count):
+                    handle = ring.write(slot, frame)
+                    result = pool.submit(_roundtrip_shm, handle).result()
+                    ring.view(result)
+                shm_time = (time.perf_counter() - start) / args.count
+                ring.release(slot)
+
+        for name, seconds in (("pickle", pickle_time), ("shm", shm_time)):
+            print(f"{size_text:<12}{name:<12}{seconds * 1000:>10.1f}{frame_mb / seconds:>10.0f}")
+
+
+def bench_backends(args):
+    """Compare load time and throughput of the RMBG-2.0 backends."""
+    from model_registry import ModelRegistry
+
+    width, height = parse_size(args.size)
+    images = [make_synthetic_image(width, height, seed=i) for i in range(args.count)]
+
+    rows = []
+    for backend in args.backends:
+        registry = ModelRegistry(onnx_model_path=args.onnx_model)
+        try:
+            remover = registry.get(backend)
+        except Exception as e:
+            print(f"Skipping {backend}: {e}")
+            continue
+        load = registry.stats()[backend]
+
+        for resolution in args.resolutions:
+            remover.resolution = resolution if resolution == "auto" else int(resolution)
+            remover.batch_remove_background(images[:1], batch_size=1)  # Warm-up
+            for batch_size in args.batch_sizes:
+                start = time.perf_counter()
+                remover.batch_remove_background(images, batch_size=batch_size)
+                elapsed = time.perf_counter() - start
+                rows.append((backend, load["load_time"], load["rss_bytes"], remover.resolution,
+                             batch_size, elapsed / len(images)))
+
+    print(f"\n{args.count} images at {width}x{height}\n")
+    print(f"{'backend':<12}{'load s':>8}{'load MB':>9}{'res':>6}{'batch':>7}{'ms/img':>10}"
+          f"{'img/s':>8}")
+    for backend, load_time, rss, resolution, batch_size, seconds in rows:
+        print(f"{backend:<12}{load_time:>8.2f}{rss / (1024 * 1024):>9.0f}{resolution:>6}"
+              f"{batch_size:>7}{seconds * 1000:>10.1f}{1 / seconds:>8.2f}")
+
+
+def _pil_preprocess(image, resolution):
+    """The former RMBGRemover path: BGR->RGB, PIL resize, ToTensor, Normalize."""
+    from PIL import Image
+    from rmbg_common import NORMALIZE_MEAN, NORMALIZE_STD
+
+    rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    resized = Image.fromarray(rgb).resize((resolution, resolution), Image.BILINEAR)
+    tensor = np.asarray(resized, dtype=np.float32).transpose(2, 0, 1) / 255.0  # ToTensor
+    return (tensor - NORMALIZE_MEAN[:, None, None]) / NORMALIZE_STD[:, None, None]  # Normalize
+
+
+def bench_preprocess(args):
+    """Compare time and peak memory of RMBG-2.0 preprocessing paths."""
+    import tracemalloc
+    from rmbg_common import preprocess
+
+    paths = {
+        "pil": _pil_preprocess,
+        "cv2": preprocess,
+    }
+
+    print(f"{'size':<12}{'path':<8}{'ms/img':>10}{'peak MB':>10}")
+    for size_text in args.sizes:
+        width, height = parse_size(size_text)
+        image = make_synthetic_image(width, height)
+
+        for name, function in paths.items():
+            function(image, args.resolution)  # Warm-up
+
+            start = time.perf_counter()
+            for _ in range(args.count):
+                function(image, args.resolution)
+            seconds = (time.perf_counter() - start) / args.count
+
+            # NumPy reports its buffers to tracemalloc; OpenCV/PIL temporaries
+            # that are not NumPy arrays are not counted
+            tracemalloc.start()
+            function(image, args.resolution)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+
+            print(f"{size_text:<12}{name:<8}{seconds * 1000:>10.1f}{peak / (1024 * 1024):>10.1f}")
+
+
+def _time_per_call(function, count):
+    """Mean seconds per call of function() after one warm-up call."""
+    function()
+    start = time.perf_counter()
+    for _ in range(count):
+        function()
+    return (time.perf_counter() - start) / count
+
+
+def _inpaint_full_frame(image, regions):
+    """Reference: inpaint with a full-frame mask, as inpaint_watermark used to."""
+    from watermark_remover import INPAINT_RADIUS, REGION_PADDING
+
+    mask = np.zeros(image.shape[:2], dtype=np.uint8)
+    for x, y, w, h in regions:
+        x, y = max(0, x - REGION_PADDING), max(0, y - REGION_PADDING)
+        mask[y:y + h + 2 * REGION_PADDING, x:x + w + 2 * REGION_PADDING] = 255
+    return cv2.inpaint(image, mask, INPAINT_RADIUS, cv2.INPAINT_TELEA)
+
+
+def bench_watermark(args):
+    """Time watermark detection and inpainting at several image sizes.
+
+    Inpainting uses one 240x40 watermark box in the bottom-right corner
+    and is timed both on the full frame and crop-local.
+    """
+    from watermark_remover import WatermarkRemover
+
+    remover = WatermarkRemover()
+    print(f"{'size':<12}{'detect ms':>11}{'full-frame ms':>15}{'crop ms':>10}{'identical':>11}")
+    for size_text in args.sizes:
+        width, height = parse_size(size_text)
+        image = make_synthetic_image(width, height)
+        regions = [(int(width * 0.8), int(height * 0.93), 240, 40)]
+
+        detect = _time_per_call(lambda: remover.detect_watermark_region(image), args.count)
+        full = _time_per_call(lambda: _inpaint_full_frame(image, regions), args.count)
+        crop = _time_per_call(lambda: remover.inpaint_watermark(image, regions), args.count)
+        identical = np.array_equal(_inpaint_full_frame(image, regions),
+                                   remover.inpaint_watermark(image, regions))
+        print(f"{size_text:<12}{detect * 1000:>11.2f}{full * 1000:>15.1f}{crop * 1000:>10.2f}"
+              f"{str(identical):>11}")
+
+
+# Model held by bench_prefork workers (set before forking in prefork mode)
+_bench_model = None
+
+
+def _smaps_rollup(pid):
+    """Return (rss, pss) of a process in bytes, from /proc/<pid>/smaps_rollup."""
+    values = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            key, _, rest = line.partition(":")
+            if key in ("Rss", "Pss"):
+                values[key] = int(rest.split()[0]) * 1024
+    return values["Rss"], values["Pss"]
+
+
+def _load_bench_model(backend, model_mb):
+    """Load the model whose memory is measured ("synthetic" = a weight array)."""
+    if backend == "synthetic":
+        return np.random.default_rng(0).random(int(model_mb * 1024 * 1024) // 8)
+    from model_registry import ModelRegistry
+    with quiet():
+        return ModelRegistry().get(backend)
+
+
+def _use_bench_model(model):
+    """Run one inference so every weight page is touched."""
+    if isinstance(model, np.ndarray):
+        return float(model.sum())
+    with quiet():
+        return model.batch_remove_background([make_synthetic_image(320, 240)], batch_size=1)
+
+
+def _bench_memory_worker(backend, model_mb, ready, release):
+    global _bench_model
+    if _bench_model is None:  # Not forked from a loaded parent: load a private copy
+        _bench_model = _load_bench_model(backend, model_mb)
+    _use_bench_model(_bench_model)
+    ready.put(os.getpid())
+    release.wait()
+
+
+def bench_prefork(args):
+    """Compare worker memory with per-worker model loading and pre-fork sharing.
+
+    PSS (proportional set size) divides every shared page between the
+    processes mapping it, so the sum over all processes is the memory
+    the workers really use together; RSS counts shared pages in full.
+    """
+    global _bench_model
+    context = multiprocessing.get_context("fork")
+
+    print(f"{args.workers} workers, backend {args.backend}\n")
+    print(f"{'mode':<12}{'RSS/worker MB':>15}{'PSS/worker MB':>15}{'total PSS MB':>14}")
+    for mode in ("per-worker", "prefork"):
+        if mode == "prefork":
+            _bench_model = _load_bench_model(args.backend, args.model_mb)
+            gc.collect()
+            gc.freeze()
+
+        ready, release = context.Queue(), context.Event()
+        processes = [context.Process(target=_bench_memory_worker,
+                                     args=(args.backend, args.model_mb, ready, release))
+                     for _ in range(args.workers)]
+        for process in processes:
+            process.start()
+        pids = [ready.get() for _ in processes]
+
+        usage = [_smaps_rollup(pid) for pid in pids]
+        parent_pss = _smaps_rollup(os.getpid())[1]
+        release.set()
+        for process in processes:
+            process.join()
+        gc.unfreeze()
+
+        mb = 1024 * 1024
+        rss = sum(r for r, _ in usage) / len(usage) / mb
+        pss = sum(p for _, p in usage) / len(usage) / mb
+        total = (sum(p for _, p in usage) + parent_pss) / mb
+        print(f"{mode:<12}{rss:>15.0f}{pss:>15.0f}{total:>14.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark image purifier processing paths")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    executors_parser = subparsers.add_parser(
+        "executors", help="Compare sequential, thread, process and pipeline executors")
+    executors_parser.add_argument("--count", type=int, default=48, help="Number of images")
+    executors_parser.add_argument("--size", default="1920x1080", help="Image size WIDTHxHEIGHT")
+    executors_parser.add_argument("--workers", type=int, nargs="+", default=[2, 4],
+                                  help="Worker counts to try")
+    executors_parser.set_defaults(func=bench_executors)
+
+    transport_parser = subparsers.add_parser(
+        "transport", help="Compare pickling frames with shared memory transport")
+    transport_parser.add_argument("--count", type=int, default=20, help="Round trips per size")
+    transport_parser.add_argument("--sizes", nargs="+", default=["3840x2160", "7680x4320"],
+                                  help="Frame sizes WIDTHxHEIGHT")
+    transport_parser.set_defaults(func=bench_transport)
+
+    backends_parser = subparsers.add_parser(
+        "backends", help="Compare RMBG-2.0 backends (PyTorch vs ONNX Runtime)")
+    backends_parser.add_argument("--backends", nargs="+", default=["rmbg", "rmbg-onnx"],
+                                 help="Backends to compare")
+    backends_parser.add_argument("--onnx-model", help="Exported ONNX model path")
+    backends_parser.add_argument("--count", type=int, default=16, help="Number of images")
+    backends_parser.add_argument("--size", default="1920x1080", help="Image size WIDTHxHEIGHT")
+    backends_parser.add_argument("--batch-sizes", type=int, nargs="+", default=[1, 4],
+                                 help="Batch sizes to try")
+    backends_parser.add_argument("--resolutions", nargs="+", default=["512", "768", "1024"],
+                                 help="Inference resolutions to try (pixels or 'auto')")
+    backends_parser.set_defaults(func=bench_backends)
+
+    preprocess_parser = subparsers.add_parser(
+        "preprocess", help="Compare RMBG-2.0 preprocessing paths (PIL round-trip vs cv2/NumPy)")
+    preprocess_parser.add_argument("--count", type=int, default=20, help="Repetitions per size")
+    preprocess_parser.add_argument("--sizes", nargs="+", default=["1920x1080", "3840x2160"],
+                                   help="Image sizes WIDTHxHEIGHT")
+    preprocess_parser.add_argument("--resolution", type=int, default=1024,
+                                   help="Model input resolution")
+    preprocess_parser.set_defaults(func=bench_preprocess)
+
+    watermark_parser = subparsers.add_parser(
+        "watermark", help="Time watermark detection and full-frame vs crop-local inpainting")
+    watermark_parser.add_argument("--count", type=int, default=20, help="Repetitions per size")
+    watermark_parser.add_argument("--sizes", nargs="+",
+                                  default=["1920x1080", "3840x2160", "7680x4320"],
+                                  help="Image sizes WIDTHxHEIGHT")
+    watermark_parser.set_defaults(func=bench_watermark)
+
+    prefork_parser = subparsers.add_parser(
+        "prefork", help="Compare worker RSS/PSS with per-worker models and pre-fork sharing")
+    prefork_parser.add_argument("--workers", type=int, default=4, help="Number of workers")
+    prefork_parser.add_argument("--backend", choices=["synthetic", "rmbg"], default="synthetic",
+                                help="Model to load: a synthetic weight array or RMBG-2.0")
+    prefork_parser.add_argument("--model-mb", type=float, default=512,
+                                help="Size of the synthetic model in MB")
+    prefork_parser.set_defaults(func=bench_prefork)
+
+    args = parser.parse_args()
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
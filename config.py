@@ -1,16 +1,21 @@
 """Configuration for watermark patterns and detection."""
 
 # Known AI tool watermark patterns (typically appear in specific locations)
+# "mask_box" is the fixed position of the mark as (x1, y1, x2, y2) fractions of
+# the image size, used by --generator; without one, the typical_location strip
+# limited to the bottom height_ratio is used
 WATERMARK_CONFIGS = {
     "gemini": {
         "typical_location": "bottom_right",
         "text_patterns": ["gemini", "google gemini"],
         "height_ratio": 0.15,  # Watermark typically in bottom 15% of image
+        "mask_box": (0.92, 0.92, 0.98, 0.98),  # Sparkle icon near the corner
     },
     "sora": {
         "typical_location": "bottom_left",
         "text_patterns": ["sora", "openai sora"],
         "height_ratio": 0.15,
+        "mask_box": (0.02, 0.93, 0.18, 0.98),
     },
     "midjourney": {
         "typical_location": "bottom",
@@ -21,6 +26,7 @@ WATERMARK_CONFIGS = {
         "typical_location": "bottom_right",
         "text_patterns": ["dall·e", "dall-e", "dalle"],
         "height_ratio": 0.15,
+        "mask_box": (0.90, 0.97, 1.0, 1.0),  # Color bar in the corner
     },
     "stable_diffusion": {
         "typical_location": "bottom",
@@ -29,6 +35,13 @@ WATERMARK_CONFIGS = {
     },
 }
 
+# Strips searched for watermarks, as (x1, y1, x2, y2) fractions of the image size
+WATERMARK_SEARCH_REGIONS = {
+    "bottom_right": (0.7, 0.85, 1.0, 1.0),
+    "bottom_left": (0.0, 0.85, 0.3, 1.0),
+    "bottom": (0.3, 0.9, 0.7, 1.0),
+}
+
 # Background removal color thresholds
 BACKGROUND_COLORS = {
     "white": (255, 255, 255),
@@ -39,3 +52,16 @@ BACKGROUND_COLORS = {
 
 # Color tolerance for background removal
 COLOR_TOLERANCE = 30
+
+# AI background removal methods and their display names
+AI_METHODS = {
+    "rembg": "rembg (U2-Net)",
+    "rmbg": "BRIA RMBG-2.0",
+    "rmbg-onnx": "BRIA RMBG-2.0 (ONNX Runtime)",
+}
+
+# Methods backed by an RMBG-2.0 model (support batched inference)
+RMBG_METHODS = ("rmbg", "rmbg-onnx")
+
+# Parallel executors for directory runs (see executors.py)
+EXECUTORS = ("process", "thread", "pipeline", "hybrid")
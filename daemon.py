@@ -0,0 +1,240 @@
+"""Persistent purifier daemon with warm models, and its thin client.
+
+The daemon keeps one ImageProcessor (and the models it has loaded)
+resident and serves process_image jobs over a Unix domain socket, so a
+CLI call per image only pays for a socket round-trip instead of
+interpreter startup, imports and model loading.
+
+Unix domain sockets are not available on every platform (e.g. Windows);
+there the daemon cannot be started and clients fall back to processing
+in their own process.
+
+Protocol: one JSON object per line in each direction.
+  {"command": "ping"}
+      -> {"ok": true, "pid": ..., "processor": <ImageProcessor init kwargs>}
+  {"command": "process", "input": ..., "output": ..., "options": {...}}
+      -> {"ok": <success>, "error": <message or null>}
+"""
+
+import getpass
+import json
+import os
+import re
+import socket
+import socketserver
+import tempfile
+
+
+def unix_sockets_available():
+    """Return whether this platform supports Unix domain sockets."""
+    return hasattr(socket, "AF_UNIX")
+
+
+def default_socket_path():
+    """Return the per-user socket path, in the runtime directory if there is one."""
+    try:
+        user = getpass.getuser()
+    except Exception:
+        user = "user"
+    user = re.sub(r"[^A-Za-z0-9_.-]", "_", user)
+    return os.path.join(os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir(),
+                        f"image-purifier-{user}.sock")
+
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            try:
+                request = json.loads(line)
+            except ValueError as e:
+                response = {"ok": False, "error": f"Invalid request: {e}"}
+            else:
+                response = self.server.purifier_daemon.handle_request(request)
+            self.wfile.write((json.dumps(response) + "\n").encode())
+            self.wfile.flush()
+
+
+if unix_sockets_available():
+    class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+        daemon_threads = True
+
+
+class PurifierDaemon:
+    """Serves process_image jobs for one resident ImageProcessor."""
+
+    def __init__(self, processor, socket_path=None):
+        """Initialize the daemon.
+
+        Args:
+            processor: ImageProcessor whose models stay loaded between jobs
+            socket_path: Unix domain socket to listen on (default:
+                default_socket_path())
+        """
+        self.processor = processor
+        self.socket_path = str(socket_path or default_socket_path())
+        self.server = None
+
+    def handle_request(self, request):
+        """Run one decoded request and return the response dict."""
+        command = request.get("command")
+        if command == "ping":
+            return {"ok": True, "pid": os.getpid(), "processor": self.processor.init_kwargs}
+        if command == "process":
+            try:
+                success = self.processor.process_image(
+                    request["input"], request["output"], **request.get("options", {}))
+            except Exception as e:
+                return {"ok": False, "error": str(e)}
+            return {"ok": success, "error": None if success else "Processing failed (see daemon log)"}
+        return {"ok": False, "error": f"Unknown command: {command}"}
+
+    def _remove_stale_socket(self):
+        """Delete a socket file left behind by a daemon that is gone."""
+        if not os.path.exists(self.socket_path):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.socket_path)
+        except OSError:
+            os.unlink(self.socket_path)
+        else:
+            raise RuntimeError(f"A daemon is already listening on {self.socket_path}")
+        finally:
+            probe.close()
+
+    def serve_forever(self):
+        """Listen for jobs until interrupted (Ctrl+C), then remove the socket.
+
+        Raises:
+            RuntimeError: If Unix sockets are unavailable or another
+                daemon already listens on the socket
+        """
+        if not unix_sockets_available():
+            raise RuntimeError("The daemon needs Unix domain sockets, "
+                               "which this platform does not provide")
+        self._remove_stale_socket()
+
+        # Only the owning user may submit jobs
+        old_umask = os.umask(0o177)
+        try:
+            self.server = _UnixServer(self.socket_path, _RequestHandler)
+        finally:
+            os.umask(old_umask)
+        self.server.purifier_daemon = self
+
+        print(f"Daemon listening on {self.socket_path} (pid {os.getpid()}), Ctrl+C to stop")
+        try:
+            self.server.serve_forever()
+        except KeyboardInterrupt:
+            print("\nStopping daemon...")
+        finally:
+            self.server.server_close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+
+
+class DaemonClient:
+    """Client side of the daemon protocol."""
+
+    def __init__(self, socket_path=None):
+        """Connect to a running daemon.
+
+        Args:
+            socket_path: Unix domain socket the daemon listens on (default:
+                default_socket_path())
+
+        Raises:
+            OSError: If no daemon is listening
+        """
+        self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            self._socket.connect(str(socket_path or default_socket_path()))
+        except OSError:
+            self._socket.close()
+            raise
+        self._file = self._socket.makefile("rwb")
+
+    def request(self, payload):
+        """Send one request and wait for its response."""
+        self._file.write((json.dumps(payload) + "\n").encode())
+        self._file.flush()
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Daemon closed the connection")
+        return json.loads(line)
+
+    def ping(self):
+        """Return the daemon's pid and processor settings."""
+        return self.request({"command": "ping"})
+
+    def process_image(self, input_path, output_path, **options):
+        """Have the daemon process one image.
+
+        Returns:
+            Response dict with "ok" and "error"
+        """
+        return self.request({
+            "command": "process",
+            "input": os.path.abspath(input_path),
+            "output": os.path.abspath(output_path),
+            "options": options,
+        })
+
+    def close(self):
+        """Close the connection."""
+        self._file.close()
+        self._socket.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def submit_job(input_path, output_path, processor_kwargs, options, socket_path=None):
+    """Process an image through a running daemon if one can serve it.
+
+    Args:
+        input_path: Image to process
+        output_path: Where the daemon writes the result
+        processor_kwargs: ImageProcessor settings this run needs; the
+            daemon is only used if it was started with the same ones
+        options: process_image keyword arguments
+        socket_path: Unix domain socket of the daemon (default:
+            default_socket_path())
+
+    Returns:
+        True/False for the job's success, or None if no compatible daemon
+        is running and the caller should process the image itself
+    """
+    if not unix_sockets_available():
+        print("Unix domain sockets are not available on this platform, "
+              "processing in this process")
+        return None
+
+    socket_path = socket_path or default_socket_path()
+    try:
+        client = DaemonClient(socket_path)
+    except OSError:
+        print(f"No daemon on {socket_path}, processing in this process")
+        return None
+
+    with client:
+        try:
+            daemon_kwargs = client.ping()["processor"]
+            if daemon_kwargs != processor_kwargs:
+                print("Daemon was started with different settings, processing in this process")
+                return None
+
+            print(f"Processing via daemon: {input_path}")
+            response = client.process_image(input_path, output_path, **options)
+        except (OSError, ValueError) as e:
+            print(f"Daemon request failed ({e}), processing in this process")
+            return None
+
+    if response.get("error"):
+        print(f"Error: {response['error']}")
+    return bool(response.get("ok"))
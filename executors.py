@@ -0,0 +1,511 @@
+"""Execution strategies used by ImageProcessor.process_directory.
+
+Each runner takes a list of (input_file, output_file) jobs plus the
+process_image options and yields (input_file, success) as jobs finish.
+Output paths are planned by the caller, so every runner writes exactly
+the same files.
+
+Runners also accept a `stop` event: once it is set they start no new
+images, finish the ones in flight and return. Jobs that never started
+are not yielded.
+"""
+
+import contextlib
+import gc
+import multiprocessing
+import queue
+import signal
+import threading
+from concurrent.futures import (FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor,
+                                as_completed, wait)
+
+from shm_transport import SharedFrameRing, pack, unpack
+
+# Default bound of each queue between pipeline stages
+PIPELINE_QUEUE_SIZE = 8
+
+# End-of-stream marker passed between pipeline stages
+_DONE = object()
+
+# Per-process ImageProcessor used by pool workers (built once per worker)
+_worker_processor = None
+# Shared frame ring the worker is attached to (hybrid executor only)
+_worker_ring = None
+
+
+def _init_process_worker(options, ring_spec=None, budget=None, budget_workers=1, counter=None,
+                         processor_kwargs=None, inherited=False, watermark_masks=None):
+    """Build the worker's ImageProcessor and warm up any AI model it needs.
+
+    When a ThreadBudget is given, this worker's share is applied before
+    any model is loaded; `counter` hands out worker indices for pinning.
+    `processor_kwargs` are the parent processor's constructor arguments.
+    With `inherited`, the worker was forked from a parent that already
+    set _worker_processor (see run_process_pool), so nothing is built.
+    `watermark_masks` are the parent's learned consensus masks.
+    """
+    global _worker_processor, _worker_ring
+    from image_processor import ImageProcessor
+
+    # Ctrl-C is handled by the parent, which lets in-flight images finish
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    if budget is not None:
+        index = None
+        if counter is not None:
+            with counter.get_lock():
+                index = counter.value
+                counter.value += 1
+        budget.apply(budget_workers, index)
+
+    if not inherited:
+        _worker_processor = ImageProcessor(**(processor_kwargs or {}))
+        _worker_processor.watermark_remover.consensus_masks = watermark_masks or {}
+        _worker_processor.warm_up(**options)
+    if ring_spec is not None:
+        _worker_ring = SharedFrameRing.attach(ring_spec)
+
+
+def _process_in_worker(input_file, output_file, options):
+    """Process one job with the worker's ImageProcessor."""
+    return _worker_processor.process_image(input_file, output_file, **options)
+
+
+def _prepare_in_worker(input_file, options, slot=None):
+    """Decode an image and run the CPU-only steps (everything but AI keying).
+
+    The result is returned through shared memory slot `slot` when one is
+    given and the frame fits, and pickled otherwise.
+    """
+    image = _worker_processor.load_image(input_file)
+    if image is None:
+        return None
+    image = _worker_processor.transform_image(image, **options)
+    return pack(_worker_ring, slot, image)
+
+
+def _finish_in_worker(image, output_file):
+    """Encode and write an image (array or shared memory handle) in a worker."""
+    _worker_processor.save_image(unpack(_worker_ring, image), output_file)
+    return True
+
+
+@contextlib.contextmanager
+def stop_on_interrupt():
+    """Turn the first Ctrl-C into a graceful stop request.
+
+    Yields a threading.Event that is set on the first SIGINT so runners
+    can finish in-flight images; a second Ctrl-C interrupts immediately.
+    Outside the main thread the event is simply never set by a signal.
+    """
+    stop = threading.Event()
+
+    if threading.current_thread() is not threading.main_thread():
+        yield stop
+        return
+
+    previous = signal.getsignal(signal.SIGINT)
+
+    def handler(signum, frame):
+        print("\nInterrupted: finishing in-flight images (Ctrl-C again to abort)...")
+        stop.set()
+        signal.signal(signal.SIGINT, signal.default_int_handler)
+
+    signal.signal(signal.SIGINT, handler)
+    try:
+        yield stop
+    finally:
+        signal.signal(signal.SIGINT, previous)
+
+
+def _stopped(stop):
+    return stop is not None and stop.is_set()
+
+
+def run_sequential(processor, jobs, options, stop=None):
+    """Process jobs one after another in the calling thread.
+
+    Args:
+        processor: ImageProcessor instance
+        jobs: List of (input_file, output_file) tuples
+        options: Keyword arguments for process_image
+        stop: Optional threading.Event requesting a graceful stop
+
+    Yields:
+        (input_file, success) tuples in job order
+    """
+    for input_file, output_file in jobs:
+        if _stopped(stop):
+            return
+        yield input_file, processor.process_image(input_file, output_file, **options)
+
+
+def run_batched(processor, jobs, options, batch_size, stop=None):
+    """Process AI background removal jobs in chunks with batched inference.
+
+    Each chunk of `batch_size` images is decoded and watermark-cleaned one
+    by one, then segmented in one batched model call and written out.
+
+    Args:
+        processor: ImageProcessor instance
+        jobs: List of (input_file, output_file) tuples
+        options: Keyword arguments for process_image (must use AI keying)
+        batch_size: Number of images per chunk / forward pass
+        stop: Optional threading.Event requesting a graceful stop
+
+    Yields:
+        (input_file, success) tuples in job order
+    """
+    processor.warm_up(**options)
+    cpu_options = dict(options, remove_background=False)
+    ai_method = options.get("ai_method", "rembg")
+
+    for start in range(0, len(jobs), batch_size):
+        if _stopped(stop):
+            return
+
+        chunk = []
+        for input_file, output_file in jobs[start:start + batch_size]:
+            try:
+                image = processor.load_image(input_file)
+                if image is None:
+                    yield input_file, False
+                    continue
+                chunk.append((input_file, output_file,
+                              processor.transform_image(image, **cpu_options)))
+            except Exception as e:
+                print(f"Error processing {input_file}: {str(e)}")
+                yield input_file, False
+
+        if not chunk:
+            continue
+
+        print(f"  - Removing background for {len(chunk)} image(s) in one batch...")
+        try:
+            images = processor.background_remover.remove_with_ai_batch(
+                [image for _, _, image in chunk], method=ai_method, batch_size=batch_size)
+        except Exception as e:
+            print(f"Error in batched inference: {str(e)}")
+            for input_file, _, _ in chunk:
+                yield input_file, False
+            continue
+
+        for (input_file, output_file, _), image in zip(chunk, images):
+            try:
+                processor.save_image(image, output_file)
+                yield input_file, True
+            except Exception as e:
+                print(f"Error processing {input_file}: {str(e)}")
+                yield input_file, False
+
+
+def _collect(futures, stop=None):
+    """Yield (input_file, success) for a dict of future -> input_file.
+
+    Once `stop` is set, futures that have not started are cancelled and
+    skipped while running ones are still collected.
+    """
+    cancelled = False
+    for future in as_completed(futures):
+        if _stopped(stop) and not cancelled:
+            for pending in futures:
+                pending.cancel()
+            cancelled = True
+        if future.cancelled():
+            continue
+
+        input_file = futures[future]
+        try:
+            success = future.result()
+        except Exception as e:
+            print(f"Error processing {input_file}: {str(e)}")
+            success = False
+        yield input_file, success
+
+
+def run_thread_pool(processor, jobs, options, workers, stop=None):
+    """Process jobs on a pool of threads sharing one ImageProcessor.
+
+    The heavy OpenCV calls (imread/imwrite, Canny, inpaint, inRange)
+    release the GIL, so threads run them in parallel without copying
+    images between processes or duplicating AI models in memory.
+
+    Args:
+        processor: ImageProcessor instance shared by all threads
+        jobs: List of (input_file, output_file) tuples
+        options: Keyword arguments for process_image
+        workers: Number of threads
+        stop: Optional threading.Event requesting a graceful stop
+
+    Yields:
+        (input_file, success) tuples in completion order
+    """
+    processor.warm_up(**options)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(processor.process_image, input_file, output_file, **options): input_file
+            for input_file, output_file in jobs
+        }
+        yield from _collect(futures, stop)
+
+
+def run_process_pool(jobs, options, workers, budget=None, stop=None, processor_kwargs=None,
+                     prefork_processor=None, watermark_masks=None):
+    """Process jobs on a pool of worker processes.
+
+    Every worker builds its own ImageProcessor (and loads any AI model)
+    once, then handles many jobs. Results are yielded as they complete.
+
+    With `prefork_processor`, workers are instead forked from this
+    process and inherit that processor with its already loaded model.
+    The weights are shared copy-on-write and inference only reads them,
+    so they stay shared; gc.freeze() keeps the garbage collector from
+    writing to (and thereby copying) the pages of pre-fork objects.
+
+    Args:
+        jobs: List of (input_file, output_file) tuples
+        options: Keyword arguments for process_image
+        workers: Number of worker processes
+        budget: Optional ThreadBudget split evenly over the workers
+        stop: Optional threading.Event requesting a graceful stop
+        processor_kwargs: Constructor arguments for the workers' ImageProcessor
+        prefork_processor: ImageProcessor with its models loaded, to be
+            inherited by forked workers
+        watermark_masks: Consensus masks for the workers' WatermarkRemover
+
+    Yields:
+        (input_file, success) tuples in completion order
+    """
+    global _worker_processor
+
+    inherited = prefork_processor is not None
+    context = multiprocessing.get_context("fork" if inherited else None)
+    counter = context.Value("i", 0)
+    if inherited:
+        _worker_processor = prefork_processor
+        gc.collect()
+        gc.freeze()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context,
+                                 initializer=_init_process_worker,
+                                 initargs=(options, None, budget, workers, counter,
+                                           processor_kwargs, inherited,
+                                           watermark_masks)) as pool:
+            futures = {
+                pool.submit(_process_in_worker, input_file, output_file, options): input_file
+                for input_file, output_file in jobs
+            }
+            yield from _collect(futures, stop)
+    finally:
+        if inherited:
+            gc.unfreeze()
+            _worker_processor = None
+
+
+def run_pipeline(processor, jobs, options, workers=1, queue_size=PIPELINE_QUEUE_SIZE,
+                 stop=None):
+    """Process jobs as a staged read -> compute -> write pipeline.
+
+    A reader thread prefetches and decodes images, `workers` compute
+    threads run the watermark and background steps, and a writer thread
+    encodes and writes the results, so disk I/O and encoding overlap with
+    compute. Bounded queues between the stages cap the number of images
+    held in memory at roughly 2 * queue_size + workers.
+
+    Args:
+        processor: ImageProcessor instance shared by all stages
+        jobs: List of (input_file, output_file) tuples
+        options: Keyword arguments for process_image
+        workers: Number of compute threads
+        queue_size: Maximum number of images waiting between two stages
+        stop: Optional threading.Event requesting a graceful stop; the
+            reader stops and queued images are still finished
+
+    Yields:
+        (input_file, success) tuples in completion order
+    """
+    processor.warm_up(**options)
+
+    decoded = queue.Queue(maxsize=queue_size)
+    transformed = queue.Queue(maxsize=queue_size)
+    results = queue.Queue()
+    # Set when the consumer stops iterating early; the caller's stop event
+    # is only ever read, so a normal finish is not reported as a stop
+    abandoned = threading.Event()
+
+    def read_stage():
+        for input_file, output_file in jobs:
+            if abandoned.is_set() or _stopped(stop):
+                break
+            try:
+                image = processor.load_image(input_file)
+            except Exception as e:
+                print(f"Error processing {input_file}: {str(e)}")
+                image = None
+            if image is None:
+                results.put((input_file, False))
+            else:
+                decoded.put((input_file, output_file, image))
+        for _ in range(workers):
+            decoded.put(_DONE)
+
+    def compute_stage():
+        while True:
+            item = decoded.get()
+            if item is _DONE:
+                transformed.put(_DONE)
+                return
+            input_file, output_file, image = item
+            try:
+                image = processor.transform_image(image, **options)
+            except Exception as e:
+                print(f"Error processing {input_file}: {str(e)}")
+                results.put((input_file, False))
+                continue
+            transformed.put((input_file, output_file, image))
+
+    def write_stage():
+        remaining = workers
+        while remaining:
+            item = transformed.get()
+            if item is _DONE:
+                remaining -= 1
+                continue
+            input_file, output_file, image = item
+            try:
+                processor.save_image(image, output_file)
+                results.put((input_file, True))
+            except Exception as e:
+                print(f"Error processing {input_file}: {str(e)}")
+                results.put((input_file, False))
+        results.put(_DONE)
+
+    threads = [threading.Thread(target=read_stage, daemon=True),
+               threading.Thread(target=write_stage, daemon=True)]
+    threads += [threading.Thread(target=compute_stage, daemon=True) for _ in range(workers)]
+    for thread in threads:
+        thread.start()
+
+    try:
+        while True:
+            item = results.get()
+            if item is _DONE:
+                break
+            yield item
+    finally:
+        # Stop feeding new images if the consumer goes away early
+        abandoned.set()
+
+
+def run_hybrid(processor, jobs, options, workers, max_in_flight=None, shm_slot_bytes=None,
+               budget=None, stop=None):
+    """Process AI background removal jobs with split CPU and inference workers.
+
+    Decoding, watermark removal and encoding run on `workers` CPU
+    processes, while every segmentation request goes to a single
+    inference thread that holds the only copy of the RMBG/rembg model
+    (this processor's). Adding workers therefore adds CPU throughput
+    without multiplying model memory.
+
+    With `shm_slot_bytes`, frames travel between the processes through a
+    shared memory ring (one slot per in-flight image) instead of being
+    pickled; frames larger than a slot fall back to pickling.
+
+    Args:
+        processor: ImageProcessor whose model serves all inference requests
+        jobs: List of (input_file, output_file) tuples
+        options: Keyword arguments for process_image (must use AI keying)
+        workers: Number of CPU worker processes
+        max_in_flight: Maximum number of images between read and write
+            (default: 2 * workers + 2)
+        shm_slot_bytes: Size of each shared memory slot, or None to pickle
+        budget: Optional ThreadBudget; the inference worker counts as one
+            more worker next to the CPU processes
+        stop: Optional threading.Event requesting a graceful stop
+
+    Yields:
+        (input_file, success) tuples in completion order
+    """
+    if budget is not None:
+        budget.apply(workers + 1, workers)
+    processor.warm_up(**options)
+    cpu_options = dict(options, remove_background=False)
+    ai_method = options.get("ai_method", "rembg")
+    if max_in_flight is None:
+        max_in_flight = 2 * workers + 2
+
+    # With micro-batching, several requests must be outstanding for batches to
+    # form; the model still exists once, behind the queue's single worker
+    inference_threads = processor.background_remover.micro_batch_size or 1
+
+    ring = SharedFrameRing.create(max_in_flight, shm_slot_bytes) if shm_slot_bytes else None
+    ring_spec = ring.spec if ring is not None else None
+
+    def infer(frame, slot):
+        # Runs on the inference thread; the result replaces the input in its slot
+        image = processor.background_remover.remove_with_ai(unpack(ring, frame), method=ai_method)
+        return pack(ring, slot, image)
+
+    job_iter = iter(jobs)
+    pending = {}
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers,
+                                 initializer=_init_process_worker,
+                                 initargs=(cpu_options, ring_spec, budget, workers + 1,
+                                           multiprocessing.Value("i", 0),
+                                           processor.init_kwargs, False,
+                                           processor.watermark_remover.consensus_masks)) as pool, \
+                ThreadPoolExecutor(max_workers=inference_threads) as inference:
+
+            def fill():
+                # Every image between read and write has exactly one pending
+                # future, so checking before taking a job enforces the bound
+                while len(pending) < max_in_flight and not _stopped(stop):
+                    job = next(job_iter, None)
+                    if job is None:
+                        return
+                    input_file, output_file = job
+                    # The ring has max_in_flight slots, so one is always free
+                    # here; slots are only released by this thread, so waiting
+                    # for one would never end
+                    slot = ring.acquire(timeout=0) if ring is not None else None
+                    future = pool.submit(_prepare_in_worker, input_file, cpu_options, slot)
+                    pending[future] = ("prepare", input_file, output_file, slot)
+
+            def finish(slot):
+                if slot is not None:
+                    ring.release(slot)
+
+            fill()
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    stage, input_file, output_file, slot = pending.pop(future)
+                    try:
+                        value = future.result()
+                    except Exception as e:
+                        print(f"Error processing {input_file}: {str(e)}")
+                        finish(slot)
+                        yield input_file, False
+                        continue
+
+                    if stage == "prepare":
+                        if value is None:
+                            finish(slot)
+                            yield input_file, False
+                            continue
+                        future = inference.submit(infer, value, slot)
+                        pending[future] = ("infer", input_file, output_file, slot)
+                    elif stage == "infer":
+                        future = pool.submit(_finish_in_worker, value, output_file)
+                        pending[future] = ("finish", input_file, output_file, slot)
+                    else:
+                        finish(slot)
+                        yield input_file, value
+                fill()
+    finally:
+        if ring is not None:
+            ring.unlink()
@@ -1,23 +1,98 @@
 """Main image processing module."""
 
 import cv2
+import multiprocessing
 import os
 from pathlib import Path
+from PIL import Image
 from watermark_remover import WatermarkRemover
 from background_remover import BackgroundRemover
+from model_registry import ModelRegistry
+import executors
+from manifest import RunManifest
+from mask_library import MaskLibrary
+from result_cache import ResultCache, make_key
+from thread_budget import ThreadBudget
+from config import AI_METHODS, RMBG_METHODS
+from rmbg_common import MODEL_RESOLUTION
 
 
 class ImageProcessor:
     """Main class for processing images with watermark and background removal."""
 
-    def __init__(self):
-        """Initialize image processor."""
-        self.watermark_remover = WatermarkRemover()
-        self.background_remover = BackgroundRemover()
+    def __init__(self, cache_dir=None, cache_memory_mb=None, cache_disk_mb=1024,
+                 micro_batch_size=None, micro_batch_wait_ms=20, onnx_model_path=None,
+                 quantize=False, resolution=None, model_path=None, mask_library=None):
+        """Initialize image processor.
+
+        Args:
+            cache_dir: Directory for the on-disk result cache (None = no disk tier)
+            cache_memory_mb: Size of the in-memory result cache; caching is
+                enabled when this or cache_dir is set (default 256 with cache_dir)
+            cache_disk_mb: Byte budget of the on-disk result cache in MB
+            micro_batch_size: Collect concurrent RMBG-2.0 requests into batches
+                of up to this many images (None = no micro-batching)
+            micro_batch_wait_ms: Longest time a request waits for a batch to fill
+            onnx_model_path: Exported RMBG-2.0 model for the "rmbg-onnx" method
+            quantize: Use INT8-quantized RMBG-2.0 models on the CPU
+            resolution: RMBG-2.0 inference resolution in pixels, or "auto"
+                to pick one per image from its size (default: 1024)
+            model_path: Offline RMBG-2.0 bundle directory for the "rmbg" method
+            mask_library: Directory of stored watermark masks (see
+                mask_library.py), used for known generators and filled by
+                consensus runs with a generator
+        """
+        # Constructor arguments, so worker processes can build an identical processor
+        self.init_kwargs = {
+            "cache_dir": cache_dir,
+            "cache_memory_mb": cache_memory_mb,
+            "cache_disk_mb": cache_disk_mb,
+            "micro_batch_size": micro_batch_size,
+            "micro_batch_wait_ms": micro_batch_wait_ms,
+            "onnx_model_path": onnx_model_path,
+            "quantize": quantize,
+            "resolution": resolution,
+            "model_path": model_path,
+            "mask_library": mask_library,
+        }
+
+        # AI models are owned here and reused for every process_image call
+        self.model_registry = ModelRegistry(onnx_model_path=onnx_model_path, quantize=quantize,
+                                            resolution=resolution, model_path=model_path)
+        self.watermark_remover = WatermarkRemover(
+            mask_library=MaskLibrary(mask_library) if mask_library else None)
+        self.background_remover = BackgroundRemover(registry=self.model_registry,
+                                                    micro_batch_size=micro_batch_size,
+                                                    micro_batch_wait_ms=micro_batch_wait_ms)
+
+        self.result_cache = None
+        if cache_dir or cache_memory_mb:
+            memory_mb = cache_memory_mb if cache_memory_mb is not None else 256
+            self.result_cache = ResultCache(cache_dir,
+                                            memory_bytes=int(memory_mb * 1024 * 1024),
+                                            disk_bytes=int(cache_disk_mb * 1024 * 1024))
+
+    def warm_up(self, remove_background=False, use_ai=False, ai_method="rembg", **kwargs):
+        """Load the AI model a run will need before the first image arrives.
+
+        Accepts the same keyword arguments as process_image; options that do
+        not involve an AI model are ignored. Load failures are left for
+        process_image to report (and fall back from) per image.
+        """
+        if not (remove_background and use_ai):
+            return
+
+        try:
+            self.model_registry.get(ai_method)
+        except ImportError:
+            if ai_method in RMBG_METHODS:
+                self.warm_up(remove_background, use_ai, ai_method="rembg")
+        except Exception as e:
+            print(f"Warning: could not preload {ai_method} model: {e}")
 
     def process_image(self, input_path, output_path, remove_watermark=True,
                      remove_background=False, bg_color=None, aggressive=False,
-                     use_ai=False, ai_method="rembg"):
+                     use_ai=False, ai_method="rembg", generator=None, consensus=False):
         """Process a single image.
 
         Args:
@@ -28,50 +103,186 @@ class ImageProcessor:
             bg_color: Background color to remove (None for auto-detect)
             aggressive: Use aggressive watermark removal (crops bottom)
             use_ai: Use AI-based background removal instead of color-based
-            ai_method: AI method to use - "rembg" or "rmbg" (BRIA RMBG-2.0)
+            ai_method: AI method to use - "rembg", "rmbg" (BRIA RMBG-2.0) or
+                "rmbg-onnx" (RMBG-2.0 on ONNX Runtime)
+            generator: Known watermark source (key of WATERMARK_CONFIGS);
+                its fixed mask is inpainted instead of detecting watermarks
+            consensus: Inpaint the watermark mask learned for the image's
+                size by process_directory, if there is one
 
         Returns:
             True if successful, False otherwise
         """
+        options = {
+            "remove_watermark": remove_watermark,
+            "remove_background": remove_background,
+            "bg_color": bg_color,
+            "aggressive": aggressive,
+            "use_ai": use_ai,
+            "ai_method": ai_method,
+            "generator": generator,
+            "consensus": consensus,
+        }
+
         try:
-            # Read image
-            image = cv2.imread(str(input_path))
+            image = self.load_image(input_path)
             if image is None:
-                print(f"Error: Could not read image {input_path}")
                 return False
 
-            original_shape = image.shape
-            print(f"Processing: {Path(input_path).name} ({original_shape[1]}x{original_shape[0]})")
-
-            # Remove watermark
-            if remove_watermark:
-                print("  - Removing watermark...")
-                image = self.watermark_remover.smart_remove(image, aggressive=aggressive)
-
-            # Remove background
-            if remove_background:
-                if use_ai:
-                    method_name = "BRIA RMBG-2.0" if ai_method == "rmbg" else "rembg"
-                    print(f"  - Removing background (AI-based: {method_name})...")
-                    image = self.background_remover.remove_with_ai(image, method=ai_method)
-                else:
-                    print(f"  - Removing background (color: {bg_color or 'auto-detect'})...")
-                    image = self.background_remover.remove_color_background(image, color_name=bg_color)
-                    image = self.background_remover.refine_edges(image)
-
-            # Save image
-            cv2.imwrite(str(output_path), image)
-            print(f"  [OK] Saved to: {output_path}")
+            if self.result_cache is not None:
+                return self._process_cached(image, output_path, options)
 
+            image = self.transform_image(image, **options)
+            self.save_image(image, output_path)
             return True
 
         except Exception as e:
             print(f"Error processing {input_path}: {str(e)}")
             return False
 
+    def _process_cached(self, image, output_path, options):
+        """Produce an output through the result cache.
+
+        Identical pixels processed with identical options reuse the cached
+        output bytes; concurrent duplicates are computed only once.
+        """
+        extension = Path(output_path).suffix
+        height, width = image.shape[:2]
+        key = make_key(image, self._output_options(options, (width, height)), extension)
+
+        def compute():
+            return self.encode_image(self.transform_image(image, **options), extension)
+
+        data, cached = self.result_cache.get_or_compute(key, compute)
+        Path(output_path).write_bytes(data)
+        print(f"  [OK] Saved to: {output_path}{' (cached)' if cached else ''}")
+        return True
+
+    def _output_options(self, options, size=None):
+        """Return options plus the processor settings that change the output.
+
+        Used for the result cache key and the manifest, so results made
+        at another RMBG-2.0 resolution or precision (or with another ONNX
+        model), or with other consensus or mask library masks, are never
+        reused.
+
+        Args:
+            options: process_image options
+            size: (width, height) of the image whose cache key this is;
+                the digest of the mask inpainted at that size is added.
+                Without it (a whole run), the digests of all consensus
+                masks and of the generator's mask library entries are added
+        """
+        generator = options["generator"]
+        if options["remove_watermark"] and (options["consensus"] or generator):
+            remover = self.watermark_remover
+            if size is not None:
+                template = remover.select_template(*size, generator, options["consensus"])
+                options = dict(options, mask=template.digest if template else None)
+            else:
+                masks = {}
+                if options["consensus"]:
+                    masks["consensus_masks"] = {
+                        f"{width}x{height}": template.digest
+                        for (width, height), template in sorted(remover.consensus_masks.items())}
+                if generator and remover.mask_library is not None:
+                    masks["library_masks"] = {
+                        f"{width}x{height}": entry["digest"]
+                        for name, width, height, entry in remover.mask_library.entries()
+                        if name == generator and entry.get("pixels")}
+                options = dict(options, **masks)
+
+        if not (options["remove_background"] and options["use_ai"]
+                and options["ai_method"] in RMBG_METHODS):
+            return options
+        return dict(options,
+                    resolution=self.init_kwargs["resolution"] or MODEL_RESOLUTION,
+                    quantize=self.init_kwargs["quantize"],
+                    onnx_model_path=(self.init_kwargs["onnx_model_path"]
+                                     if options["ai_method"] == "rmbg-onnx" else None))
+
+    def load_image(self, input_path):
+        """Read and decode an input image.
+
+        Args:
+            input_path: Path to input image
+
+        Returns:
+            Image as numpy array (BGR format), or None if it could not be read
+        """
+        image = cv2.imread(str(input_path))
+        if image is None:
+            print(f"Error: Could not read image {input_path}")
+            return None
+
+        print(f"Processing: {Path(input_path).name} ({image.shape[1]}x{image.shape[0]})")
+        return image
+
+    def transform_image(self, image, remove_watermark=True, remove_background=False,
+                        bg_color=None, aggressive=False, use_ai=False, ai_method="rembg",
+                        generator=None, consensus=False):
+        """Run the watermark and background steps on a decoded image.
+
+        Takes the same options as process_image.
+
+        Returns:
+            Processed image (BGR, or BGRA when the background was removed)
+        """
+        # Remove watermark
+        if remove_watermark:
+            print("  - Removing watermark...")
+            image = self.watermark_remover.smart_remove(image, aggressive=aggressive,
+                                                        generator=generator,
+                                                        consensus=consensus)
+
+        # Remove background
+        if remove_background:
+            if use_ai:
+                method_name = AI_METHODS.get(ai_method, ai_method)
+                print(f"  - Removing background (AI-based: {method_name})...")
+                image = self.background_remover.remove_with_ai(image, method=ai_method)
+            else:
+                print(f"  - Removing background (color: {bg_color or 'auto-detect'})...")
+                image = self.background_remover.remove_color_background(image, color_name=bg_color)
+                image = self.background_remover.refine_edges(image)
+
+        return image
+
+    def encode_image(self, image, extension):
+        """Encode a processed image into the bytes of an image file.
+
+        Args:
+            image: Processed image
+            extension: Output format as a file extension, e.g. ".png"
+
+        Returns:
+            Encoded file contents as bytes
+        """
+        ok, buffer = cv2.imencode(extension, image)
+        if not ok:
+            raise IOError(f"Could not encode image as {extension}")
+        return buffer.tobytes()
+
+    def save_image(self, image, output_path):
+        """Encode and write a processed image.
+
+        Args:
+            image: Processed image
+            output_path: Path to save the image
+
+        Raises:
+            IOError: If the image could not be written
+        """
+        if not cv2.imwrite(str(output_path), image):
+            raise IOError(f"Could not write image {output_path}")
+        print(f"  [OK] Saved to: {output_path}")
+
     def process_directory(self, input_dir, output_dir=None, remove_watermark=True,
                          remove_background=False, bg_color=None, aggressive=False,
-                         recursive=False, use_ai=False, ai_method="rembg"):
+                         recursive=False, use_ai=False, ai_method="rembg", workers=1,
+                         executor="process", shm_slot_mb=None, threads=None, pin_cpus=False,
+                         resume=False, batch_size=1, prefork=False, generator=None,
+                         consensus=False, consensus_samples=8):
         """Process all images in a directory.
 
         Args:
@@ -83,7 +294,38 @@ class ImageProcessor:
             aggressive: Use aggressive watermark removal
             recursive: Process subdirectories recursively
             use_ai: Use AI-based background removal
-            ai_method: AI method to use - "rembg" or "rmbg" (BRIA RMBG-2.0)
+            ai_method: AI method to use - "rembg", "rmbg" (BRIA RMBG-2.0) or
+                "rmbg-onnx" (RMBG-2.0 on ONNX Runtime)
+            workers: Number of parallel workers (1 = process sequentially)
+            executor: Parallel executor - "process" (worker processes),
+                "thread" (threads sharing this processor; lower memory),
+                "pipeline" (overlapped read/compute/write stages with
+                `workers` compute threads) or "hybrid" (`workers` CPU
+                processes plus one inference thread holding the AI model)
+            shm_slot_mb: Hybrid executor only - pass frames between processes
+                through shared memory slots of this many MB instead of pickling
+            threads: Total thread budget shared by all workers for OpenCV,
+                torch and onnxruntime (default: CPUs available to the container)
+            pin_cpus: Pin each worker process to its own slice of the CPUs
+            resume: Skip inputs the output directory's manifest records as
+                already processed with the same options and unchanged since
+            batch_size: With RMBG-2.0 and a single worker, feed the model
+                chunks of this many images per batched forward pass
+            prefork: Process executor only - load the AI model here once and
+                fork the workers from this process so they share its weights
+            generator: Known watermark source; its fixed mask is inpainted
+                instead of detecting watermarks in every image
+            consensus: Detect watermarks on a sample of the images of each
+                size, combine the detections into one mask per size and
+                inpaint that mask in every image without detecting again.
+                With a generator, sizes the mask library already holds are
+                not learned again and new masks are saved to it
+            consensus_samples: Images sampled per size for the consensus
+
+        Every result is recorded in a manifest in the output directory.
+        The first Ctrl-C stops starting new images, lets in-flight ones
+        finish and flushes the manifest, so a resumed run continues exactly
+        where this one stopped.
 
         Returns:
             Tuple of (successful_count, failed_count)
@@ -117,8 +359,221 @@ class ImageProcessor:
 
         print(f"\nFound {len(image_files)} image(s) to process\n")
 
-        successful = 0
-        failed = 0
+        jobs = self._plan_jobs(image_files, input_path, output_path,
+                               recursive=recursive, remove_background=remove_background)
+
+        options = {
+            "remove_watermark": remove_watermark,
+            "remove_background": remove_background,
+            "bg_color": bg_color,
+            "aggressive": aggressive,
+            "use_ai": use_ai,
+            "ai_method": ai_method,
+            "generator": generator,
+            "consensus": consensus,
+        }
+
+        if consensus and remove_watermark:
+            # Learned from all inputs, so a resumed run uses the same masks
+            self.watermark_remover.consensus_masks = self._learn_consensus(
+                [input_file for input_file, _ in jobs], consensus_samples, generator)
+
+        with RunManifest(output_path, self._output_options(options)) as manifest, \
+                executors.stop_on_interrupt() as stop:
+            if resume:
+                pending = manifest.pending(jobs)
+                if len(pending) < len(jobs):
+                    print(f"Resuming: skipping {len(jobs) - len(pending)} already processed image(s)\n")
+                jobs = pending
+
+            if not jobs:
+                return 0, 0
+
+            results = self._run_jobs(jobs, options, workers, executor, shm_slot_mb,
+                                     threads, pin_cpus, batch_size, stop, prefork)
+            output_files = dict(jobs)
+
+            successful = 0
+            failed = 0
+
+            for input_file, success in results:
+                manifest.record(input_file, output_files[input_file], success)
+                if success:
+                    successful += 1
+                else:
+                    failed += 1
+
+                print()  # Blank line between files
+
+            if stop.is_set():
+                remaining = len(jobs) - successful - failed
+                print(f"Stopped early: {remaining} image(s) not processed, "
+                      "rerun with --resume to continue")
+
+        return successful, failed
+
+    def _run_jobs(self, jobs, options, workers, executor, shm_slot_mb, threads, pin_cpus,
+                  batch_size, stop, prefork=False):
+        """Start the chosen executor and return its (input_file, success) iterator."""
+        if executor == "hybrid" and not (options["remove_background"] and options["use_ai"]):
+            print("Note: hybrid executor only applies to AI background removal, "
+                  "using worker processes")
+            executor = "process"
+
+        budget = ThreadBudget(threads, pin=pin_cpus)
+
+        if self.result_cache is not None:
+            self._note_cache_coverage(options, workers, executor, batch_size)
+
+        if executor == "hybrid":
+            print(f"Using {workers} CPU worker process(es) and one AI inference worker, "
+                  f"{budget.threads_per_worker(workers + 1)} thread(s) each\n")
+            shm_slot_bytes = int(shm_slot_mb * 1024 * 1024) if shm_slot_mb else None
+            return executors.run_hybrid(self, jobs, options, workers,
+                                        shm_slot_bytes=shm_slot_bytes, budget=budget, stop=stop)
+
+        if workers > 1 and executor == "process":
+            prefork_processor = self._prepare_prefork(options) if prefork else None
+            shared = " forked from one loaded model" if prefork_processor else ""
+            print(f"Using {workers} worker processes{shared}, "
+                  f"{budget.threads_per_worker(workers)} thread(s) each\n")
+            return executors.run_process_pool(
+                jobs, options, workers, budget=budget, stop=stop,
+                processor_kwargs=self.init_kwargs, prefork_processor=prefork_processor,
+                watermark_masks=self.watermark_remover.consensus_masks)
+
+        # In-process executors share one set of library thread pools
+        budget.apply(workers)
+        if executor == "pipeline":
+            print(f"Using staged pipeline with {workers} compute thread(s)\n")
+            return executors.run_pipeline(self, jobs, options, workers, stop=stop)
+        if workers > 1:
+            print(f"Using {workers} worker threads\n")
+            return executors.run_thread_pool(self, jobs, options, workers, stop=stop)
+        if batch_size > 1 and options["remove_background"] and options["use_ai"]:
+            print(f"Using batched inference, {batch_size} image(s) per batch\n")
+            return executors.run_batched(self, jobs, options, batch_size, stop=stop)
+        return executors.run_sequential(self, jobs, options, stop=stop)
+
+    def _note_cache_coverage(self, options, workers, executor, batch_size):
+        """Tell the user where the result cache does not apply to this run.
+
+        Only process_image goes through the cache; the pipeline, hybrid
+        and batched runners call the processing stages directly. Worker
+        processes each have their own memory tier and in-flight tracking,
+        so they share results only through the disk tier.
+        """
+        uses_ai = options["remove_background"] and options["use_ai"]
+        if executor in ("pipeline", "hybrid"):
+            print(f"Note: the result cache is not used by the {executor} executor; "
+                  "use --executor thread or process to cache results")
+        elif workers == 1 and batch_size > 1 and uses_ai:
+            print("Note: the result cache is not used with --batch-size; "
+                  "omit it to cache results")
+        elif workers > 1 and executor == "process":
+            if self.init_kwargs["cache_dir"]:
+                print("Note: worker processes share cached results through the disk cache "
+                      "only; duplicates being processed at the same time in different "
+                      "workers are each computed")
+            else:
+                print("Note: without --cache-dir each worker process has its own "
+                      "in-memory result cache")
+
+    def _learn_consensus(self, image_files, samples, generator=None):
+        """Learn one watermark mask per image size from a sample of the inputs.
+
+        Sizes are read from the file headers; up to `samples` images spread
+        evenly over each size's files are decoded and detected. Sizes with
+        fewer than two images, or whose samples agree on no watermark,
+        keep the generator's mask or per-image detection. With a generator
+        and a mask library, sizes stored in the library are skipped and
+        learned masks are stored.
+
+        Returns:
+            Dict of (width, height) -> MaskTemplate
+        """
+        by_size = {}
+        for image_file in image_files:
+            try:
+                with Image.open(image_file) as header:
+                    size = header.size
+            except OSError:
+                continue  # Reported when the image itself is processed
+            by_size.setdefault(size, []).append(image_file)
+
+        library = self.watermark_remover.mask_library if generator else None
+        masks = {}
+        for (width, height), files in by_size.items():
+            if len(files) < 2:
+                continue
+            if library is not None and library.get(generator, width, height) is not None:
+                print(f"Using stored {generator} mask for {width}x{height}")
+                continue
+            count = min(max(samples, 2), len(files))
+            picked = [files[i * len(files) // count] for i in range(count)]
+            images = [image for image in (cv2.imread(str(f)) for f in picked)
+                      if image is not None and image.shape[:2] == (height, width)]
+            if len(images) < 2:
+                continue
+
+            template = self.watermark_remover.learn_consensus(images)
+            if not template.crops:
+                # An empty mask would inpaint nothing and shadow the
+                # generator's mask, so keep the per-image path instead
+                print(f"No consensus watermark for {width}x{height} "
+                      f"in {len(images)} sampled image(s)")
+                continue
+            masks[(width, height)] = template
+            print(f"Consensus mask for {width}x{height}: {len(template.crops)} region(s), "
+                  f"{cv2.countNonZero(template.mask)} px, "
+                  f"from {len(images)} of {len(files)} image(s)")
+            if library is not None:
+                library.put(generator, template.mask, source="consensus")
+        if masks:
+            print()
+        return masks
+
+    def _prepare_prefork(self, options):
+        """Load the run's AI model in this process for workers to inherit.
+
+        Returns:
+            self, or None (workers then load their own model) when there is
+            no model to share or it cannot survive a fork: ONNX Runtime
+            (rembg, rmbg-onnx) thread pools do not exist in a forked child,
+            and neither does a CUDA context. Platforms without the fork
+            start method (Windows) never share the model
+        """
+        if "fork" not in multiprocessing.get_all_start_methods():
+            print("Note: --prefork needs the fork start method, which this platform "
+                  "does not provide; loading the model in each worker")
+            return None
+        if not (options["remove_background"] and options["use_ai"]):
+            print("Note: --prefork only shares AI models, starting workers normally")
+            return None
+        if options["ai_method"] != "rmbg":
+            print(f"Note: --prefork supports the PyTorch rmbg backend only, "
+                  f"{options['ai_method']} is loaded in each worker")
+            return None
+
+        self.warm_up(**options)
+        if not self.model_registry.is_loaded("rmbg"):
+            return None
+        if self.model_registry.get("rmbg").device != "cpu":
+            print("Note: --prefork cannot share a CUDA model, loading it in each worker")
+            return None
+        return self
+
+    def _plan_jobs(self, image_files, input_path, output_path, recursive=False,
+                   remove_background=False):
+        """Work out the output path of every input image.
+
+        Output directories are created here so that every execution mode
+        writes exactly the same layout.
+
+        Returns:
+            List of (input_file, output_file) tuples
+        """
+        jobs = []
 
         for image_file in image_files:
             # Determine output path, preserving directory structure if recursive
@@ -133,21 +588,6 @@ class ImageProcessor:
             if remove_background and output_file.suffix.lower() != '.png':
                 output_file = output_file.with_suffix('.png')
 
-            success = self.process_image(
-                image_file, output_file,
-                remove_watermark=remove_watermark,
-                remove_background=remove_background,
-                bg_color=bg_color,
-                aggressive=aggressive,
-                use_ai=use_ai,
-                ai_method=ai_method
-            )
-
-            if success:
-                successful += 1
-            else:
-                failed += 1
-
-            print()  # Blank line between files
+            jobs.append((image_file, output_file))
 
-        return successful, failed
+        return jobs
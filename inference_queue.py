@@ -0,0 +1,158 @@
+"""Dynamic micro-batching queue in front of a batched segmentation model."""
+
+import statistics
+import threading
+import time
+from collections import Counter, deque
+from concurrent.futures import Future
+
+
+class _Request:
+    __slots__ = ("image", "future", "arrived")
+
+    def __init__(self, image):
+        self.image = image
+        self.future = Future()
+        self.arrived = time.perf_counter()
+
+
+class MicroBatchQueue:
+    """Collects single-image requests into batched forward passes.
+
+    Requests wait until either `max_batch_size` of them are queued or the
+    oldest one has waited `max_wait_ms`; the batch then runs in one call
+    to the remover's batch_remove_background. Per-request latency is thus
+    bounded by max_wait_ms plus one batch, while busy periods run at the
+    batched throughput.
+    """
+
+    def __init__(self, remover, max_batch_size=8, max_wait_ms=20):
+        """Initialize the queue and start its worker thread.
+
+        Args:
+            remover: Object with batch_remove_background(images, batch_size)
+                (e.g. RMBGRemover)
+            max_batch_size: Largest batch per forward pass
+            max_wait_ms: Longest time a request waits for others to join
+        """
+        self.remover = remover
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+
+        self._pending = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+
+        self._batch_sizes = Counter()
+        self._wait_times = deque(maxlen=10000)
+        self._requests = 0
+
+        self._worker = threading.Thread(target=self._run, name="micro-batch", daemon=True)
+        self._worker.start()
+
+    def submit(self, image):
+        """Queue an image for background removal.
+
+        Args:
+            image: numpy array of the image (BGR format)
+
+        Returns:
+            concurrent.futures.Future resolving to the BGRA result
+        """
+        request = _Request(image)
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Inference queue is closed")
+            self._pending.append(request)
+            self._condition.notify()
+        return request.future
+
+    def remove_background(self, image):
+        """Blocking drop-in for RMBGRemover.remove_background."""
+        return self.submit(image).result()
+
+    def _next_batch(self):
+        """Wait for a full batch or the oldest request's deadline."""
+        with self._condition:
+            while not self._pending and not self._closed:
+                self._condition.wait()
+            if not self._pending:
+                return None
+
+            deadline = self._pending[0].arrived + self.max_wait
+            while len(self._pending) < self.max_batch_size and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._condition.wait(remaining)
+
+            count = min(len(self._pending), self.max_batch_size)
+            return [self._pending.popleft() for _ in range(count)]
+
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch is None:
+                return
+
+            started = time.perf_counter()
+            self._batch_sizes[len(batch)] += 1
+            self._requests += len(batch)
+            self._wait_times.extend(started - request.arrived for request in batch)
+
+            try:
+                results = self.remover.batch_remove_background(
+                    [request.image for request in batch], batch_size=len(batch))
+            except Exception as e:
+                for request in batch:
+                    request.future.set_exception(e)
+                continue
+
+            for request, result in zip(batch, results):
+                request.future.set_result(result)
+
+    def close(self):
+        """Finish queued requests and stop the worker thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self._worker.join()
+
+    def stats(self):
+        """Return queue depth, batch size histogram and wait times.
+
+        Returns:
+            Dict with "queue_depth", "requests", "batches", "batch_sizes"
+            (batch size -> count) and "wait_ms" (mean/p50/p95/max over
+            recent requests)
+        """
+        with self._condition:
+            depth = len(self._pending)
+        waits = sorted(w * 1000 for w in self._wait_times)
+        wait_ms = {}
+        if waits:
+            wait_ms = {
+                "mean": statistics.fmean(waits),
+                "p50": waits[len(waits) // 2],
+                "p95": waits[min(len(waits) - 1, int(len(waits) * 0.95))],
+                "max": waits[-1],
+            }
+        return {
+            "queue_depth": depth,
+            "requests": self._requests,
+            "batches": sum(self._batch_sizes.values()),
+            "batch_sizes": dict(sorted(self._batch_sizes.items())),
+            "wait_ms": wait_ms,
+        }
+
+    def print_report(self):
+        """Print batching statistics."""
+        stats = self.stats()
+        if not stats["batches"]:
+            return
+        histogram = ", ".join(f"{size}x{count}" for size, count in stats["batch_sizes"].items())
+        print(f"Micro-batching: {stats['requests']} request(s) in {stats['batches']} batch(es) "
+              f"[{histogram}]")
+        wait = stats["wait_ms"]
+        print(f"  queue wait ms: mean {wait['mean']:.1f}, p50 {wait['p50']:.1f}, "
+              f"p95 {wait['p95']:.1f}, max {wait['max']:.1f}")
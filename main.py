@@ -2,9 +2,11 @@
 """AI Tools Image Purifier - Remove watermarks and backgrounds from images."""
 
 import argparse
+import os
 import sys
 from pathlib import Path
-from image_processor import ImageProcessor
+from thread_budget import ThreadBudget
+from config import AI_METHODS, EXECUTORS, WATERMARK_CONFIGS
 
 # Load environment variables from .env file
 try:
@@ -32,6 +34,26 @@ Examples:
   # Remove background using RMBG-2.0 (state-of-the-art, best quality)
   python main.py input_folder -b white --use-ai --ai-model rmbg
 
+  # Same model on ONNX Runtime (CPU nodes; export once with rmbg_onnx.py export)
+  python main.py input_folder -b white --use-ai --ai-model rmbg-onnx
+
+  # Air-gapped workers: package the cached model once, then load it offline
+  python model_bundle.py package --output models/rmbg-2.0
+  python main.py input_folder -b white --use-ai --ai-model rmbg --model-path models/rmbg-2.0
+
+  # Thumbnails: let RMBG-2.0 pick a smaller inference resolution per image
+  python main.py thumbnails -b white --use-ai --ai-model rmbg --resolution auto
+
+  # All images come from Gemini: inpaint its known mark position, no detection
+  python main.py input_folder -w --generator gemini
+
+  # One unknown generator's output: learn one mask per size from a sample
+  python main.py input_folder -w --consensus
+
+  # Learn Sora masks once into a shared library; later runs load them directly
+  python main.py batch1 -w --generator sora --consensus --mask-library /mnt/masks
+  python main.py batch2 -w --generator sora --mask-library /mnt/masks
+
   # Remove watermarks with aggressive mode (crops bottom)
   python main.py input_folder -w --aggressive
 
@@ -43,11 +65,34 @@ Examples:
 
   # Process recursively through subdirectories
   python main.py input_folder -w -b white -r
+
+  # Continue an interrupted run, skipping images that are already done
+  python main.py input_folder -w -b white -r --resume
+
+  # Process a large directory on 8 worker processes
+  python main.py input_folder -w -b white --workers 8
+
+  # Same, using threads instead of processes (lower memory)
+  python main.py input_folder -w -b white --workers 8 --executor thread
+
+  # 8 RMBG-2.0 worker processes sharing one copy of the model weights
+  python main.py input_folder -b white --use-ai --ai-model rmbg --workers 8 --prefork
+
+  # Overlap disk I/O with compute (useful on network storage)
+  python main.py input_folder -w -b white --workers 4 --executor pipeline
+
+  # AI background removal: OpenCV work on 8 processes, one shared model
+  python main.py input_folder -w -b white --use-ai --workers 8 --executor hybrid
+
+  # Keep RMBG-2.0 loaded in a daemon, then send single images to it
+  python main.py --serve --use-ai --ai-model rmbg
+  python main.py image.png -b white --use-ai --ai-model rmbg --use-daemon
         """
     )
 
     parser.add_argument(
         "input",
+        nargs="?",
         help="Input image file or directory"
     )
 
@@ -62,6 +107,36 @@ Examples:
         help="Remove AI tool watermarks (Gemini, Sora, DALL-E, etc.)"
     )
 
+    parser.add_argument(
+        "--generator",
+        choices=list(WATERMARK_CONFIGS),
+        help="With -w, skip watermark detection and inpaint this generator's known mark "
+             "position (mask built once per resolution)"
+    )
+
+    parser.add_argument(
+        "--consensus",
+        action="store_true",
+        help="With -w on a directory, detect watermarks on a sample of each image size, "
+             "combine them into one mask and inpaint it everywhere without detecting again"
+    )
+
+    parser.add_argument(
+        "--consensus-samples",
+        type=int,
+        default=8,
+        metavar="N",
+        help="Images sampled per image size for --consensus (default: 8)"
+    )
+
+    parser.add_argument(
+        "--mask-library",
+        metavar="DIR",
+        help="Directory of stored watermark masks: --generator uses a stored mask for the "
+             "image size when there is one, and --generator with --consensus saves the masks "
+             "it learns (manage with: python mask_library.py list|import|export)"
+    )
+
     parser.add_argument(
         "-b", "--background",
         metavar="COLOR",
@@ -88,14 +163,199 @@ Examples:
 
     parser.add_argument(
         "--ai-model",
-        choices=["rembg", "rmbg"],
+        choices=list(AI_METHODS),
         default="rembg",
-        help="AI model to use: rembg (default, U2-Net) or rmbg (BRIA RMBG-2.0, state-of-the-art)"
+        help="AI model to use: rembg (default, U2-Net), rmbg (BRIA RMBG-2.0, state-of-the-art) "
+             "or rmbg-onnx (RMBG-2.0 on ONNX Runtime, fast CPU startup)"
+    )
+
+    parser.add_argument(
+        "--onnx-model",
+        metavar="PATH",
+        help="Exported RMBG-2.0 ONNX model for --ai-model rmbg-onnx "
+             "(default: models/rmbg-2.0.onnx, create it with: python rmbg_onnx.py export)"
+    )
+
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        metavar="N",
+        help="Process a directory with N worker processes (default: 1, sequential)"
+    )
+
+    parser.add_argument(
+        "--executor",
+        choices=EXECUTORS,
+        default="process",
+        help="How --workers run: process (separate processes, default), "
+             "thread (shared memory, best for color-based pipelines) or "
+             "pipeline (overlap reading/writing with compute, best on network storage) or "
+             "hybrid (CPU processes plus a single AI model, for --use-ai)"
+    )
+
+    parser.add_argument(
+        "--shm-slot-mb",
+        type=float,
+        metavar="MB",
+        help="With --executor hybrid, pass frames between processes through shared "
+             "memory slots of this size instead of pickling (e.g. 128 for 8K BGRA)"
+    )
+
+    parser.add_argument(
+        "--prefork",
+        action="store_true",
+        help="With --workers N (process executor) and --ai-model rmbg on CPU, load the model "
+             "once and fork the workers so they share its weights instead of each loading a copy"
+    )
+
+    parser.add_argument(
+        "--threads",
+        type=int,
+        metavar="N",
+        help="Total thread budget for OpenCV, torch and onnxruntime, split evenly "
+             "over the workers (default: CPUs available to this container)"
+    )
+
+    parser.add_argument(
+        "--pin-cpus",
+        action="store_true",
+        help="Pin each worker process to its own set of CPUs"
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="Skip images already processed into the output directory with the same "
+             "options (tracked in its .purifier_manifest.sqlite)"
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        metavar="DIR",
+        help="Cache processed results by image content and options in DIR, so "
+             "duplicate images (under any name, in any batch) are processed once"
+    )
+
+    parser.add_argument(
+        "--cache-size-mb",
+        type=float,
+        default=1024,
+        metavar="MB",
+        help="Disk budget of --cache-dir; least recently used entries are evicted (default: 1024)"
+    )
+
+    parser.add_argument(
+        "--cache-memory-mb",
+        type=float,
+        metavar="MB",
+        help="Size of the in-memory result cache (default: 256 with --cache-dir, off without)"
+    )
+
+    parser.add_argument(
+        "--model-path",
+        metavar="DIR",
+        help="Load RMBG-2.0 (--ai-model rmbg) from a local bundle with memory-mapped weights "
+             "instead of Hugging Face; create one with: python model_bundle.py package"
+    )
+
+    parser.add_argument(
+        "--quantize",
+        action="store_true",
+        help="Run RMBG-2.0 (rmbg/rmbg-onnx) as a dynamically INT8-quantized model on the CPU; "
+             "check the quality with: python quantization.py verify <images>"
+    )
+
+    parser.add_argument(
+        "--resolution",
+        default="1024",
+        choices=["512", "768", "1024", "auto"],
+        help="RMBG-2.0 inference resolution; lower is faster on small images, 'auto' picks the "
+             "smallest one covering each image (default: 1024)"
+    )
+
+    parser.add_argument(
+        "--batch-size",
+        type=int,
+        default=1,
+        metavar="N",
+        help="With --use-ai --ai-model rmbg/rmbg-onnx, run the model on N images per forward pass "
+             "(sequential runs only, default: 1)"
+    )
+
+    parser.add_argument(
+        "--micro-batch",
+        type=int,
+        metavar="N",
+        help="With --ai-model rmbg/rmbg-onnx and parallel workers, collect concurrent requests "
+             "into batches of up to N images"
+    )
+
+    parser.add_argument(
+        "--micro-batch-wait-ms",
+        type=float,
+        default=20,
+        metavar="MS",
+        help="Longest time a request waits for a micro-batch to fill (default: 20)"
+    )
+
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="Run as a daemon that keeps the processor and models loaded and serves jobs "
+             "on --socket (with --use-ai, the --ai-model is loaded at startup)"
+    )
+
+    parser.add_argument(
+        "--use-daemon",
+        action="store_true",
+        help="Send a single-image job to a running --serve daemon; processes in this "
+             "process if none is running or its settings differ"
+    )
+
+    parser.add_argument(
+        "--socket",
+        metavar="PATH",
+        help="Unix socket of the daemon (default: image-purifier-<user>.sock in "
+             "$XDG_RUNTIME_DIR or the temp directory)"
     )
 
     args = parser.parse_args()
 
+    # Settings that live on the ImageProcessor; a daemon must match them to be used
+    processor_kwargs = {
+        "cache_dir": os.path.abspath(args.cache_dir) if args.cache_dir else None,
+        "cache_memory_mb": args.cache_memory_mb,
+        "cache_disk_mb": args.cache_size_mb,
+        "micro_batch_size": args.micro_batch,
+        "micro_batch_wait_ms": args.micro_batch_wait_ms,
+        "onnx_model_path": os.path.abspath(args.onnx_model) if args.onnx_model else None,
+        "quantize": args.quantize,
+        "resolution": args.resolution if args.resolution == "auto" else int(args.resolution),
+        "model_path": os.path.abspath(args.model_path) if args.model_path else None,
+        "mask_library": os.path.abspath(args.mask_library) if args.mask_library else None,
+    }
+
+    if args.serve:
+        import daemon
+        if not daemon.unix_sockets_available():
+            print("Error: --serve needs Unix domain sockets, which this platform does not provide")
+            sys.exit(1)
+        from image_processor import ImageProcessor
+        ThreadBudget(args.threads).apply()
+        processor = ImageProcessor(**processor_kwargs)
+        if args.use_ai:
+            processor.warm_up(remove_background=True, use_ai=True, ai_method=args.ai_model)
+        try:
+            daemon.PurifierDaemon(processor, args.socket).serve_forever()
+        except RuntimeError as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        return
+
     # Validate input
+    if not args.input:
+        parser.error("the following arguments are required: input")
     input_path = Path(args.input)
     if not input_path.exists():
         print(f"Error: Input path '{args.input}' does not exist")
@@ -120,18 +380,20 @@ Examples:
     if bg_color == 'auto':
         bg_color = None  # Auto-detect
 
-    # Create processor
-    processor = ImageProcessor()
-
     print("=" * 60)
     print("AI Tools Image Purifier")
     print("=" * 60)
     print(f"Input: {input_path}")
-    print(f"Remove watermarks: {args.watermark}")
+    watermark_mode = ""
+    if args.watermark and args.generator:
+        watermark_mode = f" (fixed {args.generator} mask)"
+    elif args.watermark and args.consensus:
+        watermark_mode = " (batch consensus mask)"
+    print(f"Remove watermarks: {args.watermark}{watermark_mode}")
     print(f"Remove background: {args.background or 'No'}")
     if args.use_ai and args.background:
-        model_name = "BRIA RMBG-2.0" if args.ai_model == "rmbg" else "rembg (U2-Net)"
-        print(f"Background method: AI-based ({model_name})")
+        model_name = AI_METHODS[args.ai_model]
+        print(f"Background method: AI-based ({model_name}{', INT8' if args.quantize else ''})")
     elif args.background:
         print("Background method: Color-based")
     if args.aggressive:
@@ -153,16 +415,29 @@ Examples:
         if args.background and output_path.suffix.lower() != '.png':
             output_path = output_path.with_suffix('.png')
 
-        success = processor.process_image(
-            input_path,
-            output_path,
-            remove_watermark=args.watermark,
-            remove_background=bool(args.background),
-            bg_color=bg_color,
-            aggressive=args.aggressive,
-            use_ai=args.use_ai,
-            ai_method=args.ai_model
-        )
+        options = {
+            "remove_watermark": args.watermark,
+            "remove_background": bool(args.background),
+            "bg_color": bg_color,
+            "aggressive": args.aggressive,
+            "use_ai": args.use_ai,
+            "ai_method": args.ai_model,
+            "generator": args.generator,
+        }
+
+        if args.consensus:
+            print("Note: --consensus only applies to directories, detecting watermarks")
+
+        success = None
+        if args.use_daemon:
+            import daemon
+            success = daemon.submit_job(input_path, output_path, processor_kwargs, options,
+                                        socket_path=args.socket)
+        if success is None:
+            from image_processor import ImageProcessor
+            ThreadBudget(args.threads).apply()
+            processor = ImageProcessor(**processor_kwargs)
+            success = processor.process_image(input_path, output_path, **options)
 
         if success:
             print(f"\n[SUCCESS] Image processed successfully")
@@ -171,7 +446,11 @@ Examples:
             sys.exit(1)
 
     else:
-        # Directory processing
+        # Directory processing (loads each model once, so the daemon is not used)
+        if args.use_daemon:
+            print("Note: --use-daemon only applies to single images, processing in this process")
+        from image_processor import ImageProcessor
+        processor = ImageProcessor(**processor_kwargs)
         output_dir = args.output if args.output else None
 
         successful, failed = processor.process_directory(
@@ -183,13 +462,27 @@ Examples:
             aggressive=args.aggressive,
             recursive=args.recursive,
             use_ai=args.use_ai,
-            ai_method=args.ai_model
+            ai_method=args.ai_model,
+            workers=args.workers,
+            executor=args.executor,
+            shm_slot_mb=args.shm_slot_mb,
+            threads=args.threads,
+            pin_cpus=args.pin_cpus,
+            resume=args.resume,
+            batch_size=args.batch_size,
+            prefork=args.prefork,
+            generator=args.generator,
+            consensus=args.consensus,
+            consensus_samples=args.consensus_samples
         )
 
         print("=" * 60)
         print(f"Processing complete!")
         print(f"Successful: {successful}")
         print(f"Failed: {failed}")
+        processor.model_registry.print_report()
+        for inference_queue in processor.background_remover.inference_queues.values():
+            inference_queue.print_report()
         print("=" * 60)
 
         if failed > 0:
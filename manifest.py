@@ -0,0 +1,117 @@
+"""Persistent manifest of processed images for resumable directory runs."""
+
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+
+class RunManifest:
+    """SQLite record of every input processed into an output directory.
+
+    Each row stores the input's path, size and mtime, the processing
+    options and the result. A rerun with the same options can then skip
+    every input that is unchanged since it was processed successfully.
+    """
+
+    FILENAME = ".purifier_manifest.sqlite"
+
+    # Commit after this many records (and always on flush/close)
+    COMMIT_EVERY = 50
+
+    def __init__(self, output_dir, options):
+        """Open (or create) the manifest of an output directory.
+
+        Args:
+            output_dir: Output directory of the run
+            options: process_image options of the run; results recorded
+                under different options are never treated as done
+        """
+        self.path = Path(output_dir) / self.FILENAME
+        self.options_key = json.dumps(options, sort_keys=True)
+        self._lock = threading.Lock()
+        self._uncommitted = 0
+
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " input_path TEXT PRIMARY KEY,"
+            " size INTEGER,"
+            " mtime_ns INTEGER,"
+            " options TEXT,"
+            " output_path TEXT,"
+            " success INTEGER,"
+            " processed_at REAL)"
+        )
+        self._db.commit()
+
+        # Load completed entries once so lookups are O(1) per file
+        self._done = {
+            input_path: (size, mtime_ns, output_path)
+            for input_path, size, mtime_ns, output_path in self._db.execute(
+                "SELECT input_path, size, mtime_ns, output_path FROM results"
+                " WHERE success = 1 AND options = ?", (self.options_key,))
+        }
+
+    @staticmethod
+    def _stat(input_file):
+        stat = os.stat(input_file)
+        return stat.st_size, stat.st_mtime_ns
+
+    def is_done(self, input_file, output_file):
+        """Check whether an input was already processed successfully.
+
+        True only if the input is unchanged (same size and mtime), it was
+        processed with the same options into the same output path, and
+        that output still exists.
+        """
+        entry = self._done.get(str(input_file))
+        if entry is None:
+            return False
+        try:
+            size, mtime_ns = self._stat(input_file)
+        except OSError:
+            return False
+        return (entry == (size, mtime_ns, str(output_file))
+                and os.path.exists(output_file))
+
+    def pending(self, jobs):
+        """Return the jobs that still need processing."""
+        return [job for job in jobs if not self.is_done(*job)]
+
+    def record(self, input_file, output_file, success):
+        """Record the result of one job."""
+        try:
+            size, mtime_ns = self._stat(input_file)
+        except OSError:
+            size, mtime_ns = None, None
+
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (str(input_file), size, mtime_ns, self.options_key,
+                 str(output_file), int(bool(success)), time.time()))
+            self._uncommitted += 1
+            if self._uncommitted >= self.COMMIT_EVERY:
+                self._db.commit()
+                self._uncommitted = 0
+
+    def flush(self):
+        """Commit all recorded results to disk."""
+        with self._lock:
+            self._db.commit()
+            self._uncommitted = 0
+
+    def close(self):
+        """Flush and close the manifest."""
+        self.flush()
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
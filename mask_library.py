@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""On-disk library of watermark masks keyed by generator and image size.
+
+Masks that have been established once, learned by --consensus or drawn by
+hand, are stored so later runs (and other machines sharing the directory)
+inpaint them directly instead of detecting watermarks again.
+
+Layout:
+  <library>/index.json                  {"version": 1, "masks": {"gemini/1920x1080": {...}}}
+  <library>/<generator>/<W>x<H>.png     Bilevel PNG, white where the watermark is
+
+A lookup is a stat of index.json (re-read only when it changed) and a
+dict access; an entry's PNG is decoded once and reused until its index
+entry changes, so masks added or replaced by other processes are picked
+up by long-running workers too.
+
+Usage:
+  python mask_library.py list --library masks
+  python mask_library.py import --library masks --generator gemini mask.png
+  python mask_library.py export --library masks --generator gemini --size 1920x1080 -o mask.png
+"""
+
+import argparse
+import contextlib
+import hashlib
+import json
+import os
+import re
+import sys
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from watermark_remover import MaskTemplate
+
+INDEX_NAME = "index.json"
+INDEX_VERSION = 1
+
+# Generator names become directory names
+_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+def _entry_key(generator, width, height):
+    return f"{generator}/{width}x{height}"
+
+
+def parse_size(text):
+    """Parse "WIDTHxHEIGHT" into a (width, height) tuple."""
+    match = re.fullmatch(r"(\d+)x(\d+)", text.strip().lower())
+    if not match:
+        raise ValueError(f"Invalid size '{text}', expected WIDTHxHEIGHT, e.g. 1920x1080")
+    return int(match.group(1)), int(match.group(2))
+
+
+class MaskLibrary:
+    """Directory of watermark masks indexed by (generator, width, height)."""
+
+    def __init__(self, library_dir):
+        """Open (or create) a mask library.
+
+        Args:
+            library_dir: Library directory, e.g. on a volume shared by workers
+        """
+        self.library_dir = Path(library_dir)
+        self.library_dir.mkdir(parents=True, exist_ok=True)
+        self.index_path = self.library_dir / INDEX_NAME
+
+        self._lock = threading.Lock()
+        # key -> (index entry the template was loaded for, MaskTemplate)
+        self._templates = {}
+        self._index = {}
+        self._index_mtime = None
+        self._reload_index()
+
+    def _reload_index(self):
+        """Read index.json if it changed since it was last read."""
+        try:
+            mtime = self.index_path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime == self._index_mtime:
+            return
+        with open(self.index_path, encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported mask library version in {self.index_path}")
+        self._index = index["masks"]
+        self._index_mtime = mtime
+
+    @contextlib.contextmanager
+    def _index_update(self):
+        """Lock the index across processes, yield it fresh and write it back."""
+        try:
+            import fcntl
+        except ImportError:  # Windows: no cross-process lock, writes stay atomic
+            fcntl = None
+
+        with open(self.library_dir / ".lock", "w") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            with self._lock:
+                self._reload_index()
+                yield self._index
+                tmp_path = self.index_path.with_name(f"{INDEX_NAME}.{os.getpid()}.tmp")
+                tmp_path.write_text(json.dumps({"version": INDEX_VERSION, "masks": self._index},
+                                               indent=2, sort_keys=True) + "\n",
+                                    encoding="utf-8")
+                os.replace(tmp_path, self.index_path)
+                self._index_mtime = self.index_path.stat().st_mtime_ns
+
+    def get(self, generator, width, height):
+        """Return the stored mask of a generator at one image size.
+
+        Args:
+            generator: Generator name, e.g. "gemini"
+            width: Image width in pixels
+            height: Image height in pixels
+
+        Returns:
+            MaskTemplate, or None if the library has no such entry
+        """
+        key = _entry_key(generator, width, height)
+        with self._lock:
+            self._reload_index()
+            entry = self._index.get(key)
+            # Empty entries (stored by older versions) would shadow the default mask
+            if entry is None or not entry.get("pixels"):
+                self._templates.pop(key, None)
+                return None
+
+            cached = self._templates.get(key)
+            if cached is not None and cached[0] == entry:
+                return cached[1]
+
+            mask = cv2.imread(str(self.library_dir / entry["file"]), cv2.IMREAD_GRAYSCALE)
+            if mask is None or mask.shape != (height, width):
+                print(f"Warning: mask library entry {key} is missing or damaged, ignoring it")
+                return None
+            template = MaskTemplate(np.where(mask > 127, 255, 0).astype(np.uint8))
+            self._templates[key] = (entry, template)
+            return template
+
+    def put(self, generator, mask, source="manual"):
+        """Store (or replace) the mask of a generator at the mask's size.
+
+        Args:
+            generator: Generator name (letters, digits, "_" and "-")
+            mask: uint8 array (height, width), nonzero where the watermark is
+            source: How the mask was established, e.g. "consensus" or "manual"
+
+        Returns:
+            Index entry of the stored mask
+
+        Raises:
+            ValueError: If the generator name is invalid or the mask is
+                empty (a stored mask replaces the generator's default one,
+                so an empty one would silently remove nothing)
+        """
+        if not _NAME_PATTERN.match(generator):
+            raise ValueError(f"Invalid generator name '{generator}'")
+
+        height, width = mask.shape[:2]
+        key = _entry_key(generator, width, height)
+        mask = np.where(mask > 0, 255, 0).astype(np.uint8)
+        if not mask.any():
+            raise ValueError(f"Mask for {key} is empty, not storing it")
+
+        relative = f"{generator}/{width}x{height}.png"
+        path = self.library_dir / relative
+        path.parent.mkdir(exist_ok=True)
+        ok, buffer = cv2.imencode(".png", mask, [cv2.IMWRITE_PNG_BILEVEL, 1])
+        if not ok:
+            raise IOError(f"Could not encode mask {key}")
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+        tmp_path.write_bytes(buffer.tobytes())
+        os.replace(tmp_path, path)
+
+        entry = {
+            "file": relative,
+            "digest": hashlib.blake2b(buffer.tobytes(), digest_size=16).hexdigest(),
+            "pixels": int(cv2.countNonZero(mask)),
+            "source": source,
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with self._index_update() as index:
+            index[key] = entry
+            self._templates[key] = (entry, MaskTemplate(mask))
+        return entry
+
+    def entries(self):
+        """Return (generator, width, height, entry) tuples sorted by key."""
+        with self._lock:
+            self._reload_index()
+            items = sorted(self._index.items())
+        result = []
+        for key, entry in items:
+            generator, size = key.split("/")
+            result.append((generator, *parse_size(size), entry))
+        return result
+
+    def import_mask(self, generator, image_path, source="manual"):
+        """Store a mask image (white = watermark) under a generator.
+
+        The entry's size is the image's size; gray pixels count as
+        watermark from 128 up.
+
+        Returns:
+            Index entry of the stored mask
+        """
+        mask = cv2.imread(str(image_path), cv2.IMREAD_GRAYSCALE)
+        if mask is None:
+            raise IOError(f"Could not read mask image {image_path}")
+        return self.put(generator, np.where(mask > 127, 255, 0).astype(np.uint8), source=source)
+
+    def export_mask(self, generator, width, height, output_path):
+        """Write one entry's mask to an image file.
+
+        Raises:
+            FileNotFoundError: If the library has no such entry
+        """
+        template = self.get(generator, width, height)
+        if template is None:
+            raise FileNotFoundError(f"No mask for {_entry_key(generator, width, height)} "
+                           f"in {self.library_dir}")
+        if not cv2.imwrite(str(output_path), template.mask):
+            raise IOError(f"Could not write mask {output_path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the on-disk watermark mask library")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    list_parser = subparsers.add_parser("list", help="List stored masks")
+    list_parser.add_argument("--library", required=True, help="Mask library directory")
+
+    import_parser = subparsers.add_parser(
+        "import", help="Store mask images (white = watermark) for a generator")
+    import_parser.add_argument("masks", nargs="+", help="Mask images; each is stored at its size")
+    import_parser.add_argument("--library", required=True, help="Mask library directory")
+    import_parser.add_argument("--generator", required=True, help="Generator name, e.g. gemini")
+
+    export_parser = subparsers.add_parser("export", help="Write a stored mask to an image file")
+    export_parser.add_argument("--library", required=True, help="Mask library directory")
+    export_parser.add_argument("--generator", required=True, help="Generator name, e.g. gemini")
+    export_parser.add_argument("--size", required=True, help="Image size as WIDTHxHEIGHT")
+    export_parser.add_argument("-o", "--output", required=True, help="Output image (.png)")
+
+    args = parser.parse_args()
+
+    try:
+        library = MaskLibrary(args.library)
+
+        if args.command == "list":
+            entries = library.entries()
+            if not entries:
+                print(f"No masks in {library.library_dir}")
+            for generator, width, height, entry in entries:
+                print(f"{generator:<18} {width}x{height:<7} {entry['pixels']:>9} px  "
+                      f"{entry['source']:<10} {entry['updated']}")
+
+        elif args.command == "import":
+            for path in args.masks:
+                entry = library.import_mask(args.generator, path)
+                print(f"Imported {path} as {entry['file']} ({entry['pixels']} px)")
+
+        else:
+            width, height = parse_size(args.size)
+            library.export_mask(args.generator, width, height, args.output)
+            print(f"Exported {args.generator} {width}x{height} to {args.output}")
+
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+"""Offline RMBG-2.0 model bundles with memory-mapped safetensors weights.
+
+A bundle is a plain directory holding the model's config.json, its
+remote-code .py files and a model.safetensors file. Loading one needs no
+network access or Hugging Face token, and the weights are mapped from
+the file instead of being read into private memory, so every worker
+process on a machine shares the same page-cache pages.
+
+Usage:
+  python model_bundle.py package --output models/rmbg-2.0
+  python main.py images -b white --use-ai --ai-model rmbg --model-path models/rmbg-2.0
+"""
+
+import argparse
+import contextlib
+import json
+import mmap
+import shutil
+import struct
+import sys
+from pathlib import Path
+
+# Hugging Face repository packaged by default
+DEFAULT_REPO_ID = "briaai/RMBG-2.0"
+
+WEIGHTS_NAME = "model.safetensors"
+BUNDLE_INFO_NAME = "bundle.json"
+
+# safetensors dtype names -> torch dtype attribute names
+_DTYPES = {
+    "F64": "float64", "F32": "float32", "F16": "float16", "BF16": "bfloat16",
+    "I64": "int64", "I32": "int32", "I16": "int16", "I8": "int8", "U8": "uint8",
+    "BOOL": "bool",
+}
+
+
+def load_safetensors_mmap(path):
+    """Map a safetensors file and return tensors backed by the mapping.
+
+    The file is mapped copy-on-write: untouched pages stay shared with
+    the page cache (and every other process mapping the file), while a
+    process that modifies a tensor only copies the pages it writes.
+
+    Args:
+        path: Path of a .safetensors file
+
+    Returns:
+        Dict of tensor name -> torch.Tensor
+    """
+    import torch
+
+    with open(path, "rb") as f:
+        header_size = struct.unpack("<Q", f.read(8))[0]
+        header = json.loads(f.read(header_size))
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+
+    data_start = 8 + header_size
+    tensors = {}
+    for name, entry in header.items():
+        if name == "__metadata__":
+            continue
+        dtype = getattr(torch, _DTYPES[entry["dtype"]])
+        begin, end = entry["data_offsets"]
+        if end == begin:
+            tensors[name] = torch.empty(entry["shape"], dtype=dtype)
+            continue
+        tensor = torch.frombuffer(mapping, dtype=dtype, count=(end - begin) // dtype.itemsize,
+                                  offset=data_start + begin)
+        tensors[name] = tensor.view(entry["shape"])
+    return tensors
+
+
+@contextlib.contextmanager
+def _parameters_on_meta():
+    """Create module parameters on the meta device while the block runs.
+
+    Parameters then take no memory and their random initialization does
+    nothing, so building the model costs almost nothing before the real
+    weights are assigned. Buffers are created normally, because those
+    missing from the weights file (non-persistent ones) keep their
+    constructed values.
+    """
+    import torch
+
+    register_parameter = torch.nn.Module.register_parameter
+
+    def register_on_meta(module, name, param):
+        register_parameter(module, name, param)
+        param = module._parameters[name]
+        if param is not None and not param.is_meta:
+            module._parameters[name] = type(param)(param.to("meta"), **param.__dict__)
+
+    torch.nn.Module.register_parameter = register_on_meta
+    try:
+        yield
+    finally:
+        torch.nn.Module.register_parameter = register_parameter
+
+
+def load_bundle(model_dir):
+    """Build the RMBG-2.0 model from a local bundle without network access.
+
+    Args:
+        model_dir: Bundle directory (see package_bundle)
+
+    Returns:
+        Model in eval mode on the CPU, with parameters backed by the
+        memory-mapped weights file (the model is built without allocating
+        or initializing parameters of its own)
+    """
+    from transformers import AutoConfig, AutoModelForImageSegmentation
+
+    model_dir = Path(model_dir)
+    weights_path = model_dir / WEIGHTS_NAME
+    if not weights_path.exists():
+        raise FileNotFoundError(
+            f"No {WEIGHTS_NAME} in {model_dir}\n"
+            "Create a bundle with: python model_bundle.py package --output " + str(model_dir)
+        )
+
+    config = AutoConfig.from_pretrained(model_dir, trust_remote_code=True, local_files_only=True)
+    with _parameters_on_meta():
+        model = AutoModelForImageSegmentation.from_config(config, trust_remote_code=True)
+
+    # assign=True makes the parameters the mapped tensors instead of copies
+    missing, unexpected = model.load_state_dict(load_safetensors_mmap(weights_path),
+                                                strict=False, assign=True)
+    left_on_meta = [name for name, tensor in list(model.named_parameters())
+                    + list(model.named_buffers()) if tensor.is_meta]
+    if unexpected or missing or left_on_meta:
+        raise ValueError(
+            f"{weights_path} does not match the model ({len(missing)} missing, "
+            f"{len(unexpected)} unexpected, {len(left_on_meta)} unloaded tensors); "
+            "re-create the bundle"
+        )
+    return model.eval()
+
+
+def package_bundle(output_dir, repo_id=DEFAULT_REPO_ID):
+    """Copy the locally cached Hugging Face model into an offline bundle.
+
+    The model must already be in the Hugging Face cache (run RMBG-2.0
+    once, or download it with huggingface-cli). Weights that are not
+    stored as safetensors are converted.
+
+    Args:
+        output_dir: Bundle directory to create
+        repo_id: Hugging Face repository of the cached model
+
+    Returns:
+        Path of the bundle directory
+    """
+    from huggingface_hub import snapshot_download
+
+    snapshot = Path(snapshot_download(repo_id, local_files_only=True))
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"Packaging {repo_id} from {snapshot}...")
+    for source in sorted(snapshot.iterdir()):
+        if source.suffix in (".py", ".json") and source.name != BUNDLE_INFO_NAME:
+            shutil.copy2(source, output_dir / source.name)
+
+    if (snapshot / WEIGHTS_NAME).exists():
+        shutil.copy2(snapshot / WEIGHTS_NAME, output_dir / WEIGHTS_NAME)
+    else:
+        from safetensors.torch import save_model
+        from transformers import AutoModelForImageSegmentation
+
+        print(f"  - Converting weights to {WEIGHTS_NAME}...")
+        model = AutoModelForImageSegmentation.from_pretrained(
+            snapshot, trust_remote_code=True, local_files_only=True)
+        save_model(model, str(output_dir / WEIGHTS_NAME))
+
+    info = {"source": repo_id, "revision": snapshot.name, "weights": WEIGHTS_NAME}
+    (output_dir / BUNDLE_INFO_NAME).write_text(json.dumps(info, indent=2) + "\n")
+
+    size_mb = (output_dir / WEIGHTS_NAME).stat().st_size / (1024 * 1024)
+    print(f"Bundle written to {output_dir} ({size_mb:.0f} MB of weights)")
+    return output_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline RMBG-2.0 model bundles")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    package_parser = subparsers.add_parser(
+        "package", help="Package the cached Hugging Face model into a bundle directory")
+    package_parser.add_argument("--output", required=True, help="Bundle directory to create")
+    package_parser.add_argument("--repo-id", default=DEFAULT_REPO_ID,
+                                help=f"Cached model to package (default: {DEFAULT_REPO_ID})")
+
+    args = parser.parse_args()
+
+    try:
+        package_bundle(args.output, args.repo_id)
+    except Exception as e:
+        print(f"Error: {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,148 @@
+"""Registry of AI background removal backends, loaded once per process."""
+
+import os
+import sys
+import threading
+import time
+
+
+def current_rss():
+    """Return the resident memory of this process in bytes.
+
+    Returns:
+        Resident set size in bytes, or 0 if it cannot be determined
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+
+    try:
+        import resource
+        # ru_maxrss is the peak, not the current value, but it is the best
+        # we can do without /proc (kilobytes on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError:
+        return 0
+
+
+def _load_rmbg(quantize=False, resolution=None, model_path=None):
+    """Create an RMBG-2.0 remover with its model already loaded."""
+    from rmbg_common import MODEL_RESOLUTION
+    from rmbg_remover import RMBGRemover
+    remover = RMBGRemover(quantize=quantize, resolution=resolution or MODEL_RESOLUTION,
+                          model_path=model_path)
+    remover._load_model()
+    return remover
+
+
+def _load_rmbg_onnx(model_path=None, quantize=False, resolution=None):
+    """Create an ONNX Runtime RMBG-2.0 remover with its session loaded."""
+    from rmbg_common import MODEL_RESOLUTION
+    from rmbg_onnx import DEFAULT_ONNX_PATH, RMBGOnnxRemover
+    remover = RMBGOnnxRemover(model_path or DEFAULT_ONNX_PATH, quantize=quantize,
+                              resolution=resolution or MODEL_RESOLUTION)
+    remover._load_model()
+    return remover
+
+
+def _load_rembg():
+    """Create the shared rembg session for the default model."""
+    import rembg_sessions
+    session = rembg_sessions.get_session()
+    settings = rembg_sessions.session_thread_settings()
+    print(f"  - rembg session threads: intra-op {settings['intra_op_num_threads']}, "
+          f"inter-op {settings['inter_op_num_threads']} (0 = auto)")
+    return session
+
+
+class ModelRegistry:
+    """Loads each AI backend once and hands the same instance to every caller.
+
+    Backends are created lazily on first use. Load time and the change in
+    resident memory are recorded for every backend that gets loaded.
+    """
+
+    def __init__(self, onnx_model_path=None, quantize=False, resolution=None, model_path=None):
+        """Initialize an empty registry.
+
+        Args:
+            onnx_model_path: Exported RMBG-2.0 .onnx file for the "rmbg-onnx"
+                backend (default: rmbg_onnx.DEFAULT_ONNX_PATH)
+            quantize: Load INT8-quantized RMBG-2.0 models (CPU)
+            resolution: RMBG-2.0 inference resolution in pixels or "auto"
+                (default: rmbg_common.MODEL_RESOLUTION)
+            model_path: Offline RMBG-2.0 bundle directory for the "rmbg"
+                backend (default: download from Hugging Face)
+        """
+        self._loaders = {
+            "rmbg": lambda: _load_rmbg(quantize, resolution, model_path),
+            "rmbg-onnx": lambda: _load_rmbg_onnx(onnx_model_path, quantize, resolution),
+            "rembg": _load_rembg,
+        }
+        self._backends = {}
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def get(self, name):
+        """Return the loaded backend for the given name, loading it if needed.
+
+        Args:
+            name: Backend name ("rmbg", "rmbg-onnx" or "rembg")
+
+        Returns:
+            The loaded backend object
+
+        Raises:
+            ValueError: If the backend name is unknown
+            ImportError: If the backend's dependencies are not installed
+        """
+        backend = self._backends.get(name)
+        if backend is not None:
+            return backend
+
+        if name not in self._loaders:
+            raise ValueError(f"Unknown AI backend: {name}")
+
+        with self._lock:
+            if name not in self._backends:
+                self._backends[name] = self._load(name)
+            return self._backends[name]
+
+    def _load(self, name):
+        """Run the loader for a backend and record its cost."""
+        rss_before = current_rss()
+        start = time.perf_counter()
+
+        backend = self._loaders[name]()
+
+        load_time = time.perf_counter() - start
+        rss_delta = max(0, current_rss() - rss_before)
+        self._stats[name] = {"load_time": load_time, "rss_bytes": rss_delta}
+        print(f"  - Loaded {name} backend in {load_time:.2f}s "
+              f"(+{rss_delta / (1024 * 1024):.1f} MB resident)")
+
+        return backend
+
+    def is_loaded(self, name):
+        """Check whether a backend has already been loaded."""
+        return name in self._backends
+
+    def stats(self):
+        """Return load statistics for every loaded backend.
+
+        Returns:
+            Dict mapping backend name to {"load_time": seconds, "rss_bytes": bytes}
+        """
+        return {name: dict(stat) for name, stat in self._stats.items()}
+
+    def print_report(self):
+        """Print load time and resident memory for each loaded backend."""
+        if not self._stats:
+            return
+        print("AI backends:")
+        for name, stat in self._stats.items():
+            print(f"  {name}: loaded in {stat['load_time']:.2f}s, "
+                  f"{stat['rss_bytes'] / (1024 * 1024):.1f} MB resident")
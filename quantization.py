@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""INT8 quantized RMBG-2.0 inference for CPU, with a quality check.
+
+Both RMBG-2.0 backends support dynamic INT8 quantization (weights stored
+as int8, activations quantized on the fly, no calibration data needed):
+
+  * rmbg:      torch.ao.quantization.quantize_dynamic on the Linear layers
+  * rmbg-onnx: onnxruntime.quantization.quantize_dynamic on the exported model
+
+Usage:
+  python quantization.py quantize-onnx --onnx-model models/rmbg-2.0.onnx
+  python quantization.py verify samples/*.jpg --backend rmbg-onnx
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+
+def quantize_torch_model(model):
+    """Return a dynamically INT8-quantized copy of a PyTorch model (CPU only).
+
+    Args:
+        model: RMBG-2.0 model in eval mode on the CPU
+
+    Returns:
+        Quantized model
+    """
+    import torch
+    return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+def int8_onnx_path(fp32_path):
+    """Return where the INT8 version of an ONNX model is stored."""
+    fp32_path = Path(fp32_path)
+    return fp32_path.with_name(f"{fp32_path.stem}.int8{fp32_path.suffix}")
+
+
+def quantize_onnx_model(fp32_path, int8_path=None):
+    """Write a dynamically INT8-quantized copy of an ONNX model.
+
+    Args:
+        fp32_path: Exported full-precision model
+        int8_path: Output path (default: <name>.int8.onnx next to the input)
+
+    Returns:
+        Path of the quantized model
+    """
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    int8_path = Path(int8_path) if int8_path else int8_onnx_path(fp32_path)
+    print(f"  - Quantizing {fp32_path} to INT8 ({int8_path})...")
+
+    # Worker processes may quantize concurrently; each writes its own file
+    # and the rename makes sure none of them ever loads a partial one
+    tmp_path = int8_path.with_name(f"{int8_path.stem}.{os.getpid()}.tmp{int8_path.suffix}")
+    try:
+        quantize_dynamic(str(fp32_path), str(tmp_path), weight_type=QuantType.QInt8)
+        os.replace(tmp_path, int8_path)
+    finally:
+        if tmp_path.exists():
+            tmp_path.unlink()
+    return int8_path
+
+
+def mask_iou(mask_a, mask_b, threshold=0.5):
+    """Intersection over union of two probability masks after thresholding.
+
+    Returns:
+        IoU in [0, 1] (1.0 when both masks are empty)
+    """
+    a = mask_a >= threshold
+    b = mask_b >= threshold
+    union = np.logical_or(a, b).sum()
+    if union == 0:
+        return 1.0
+    return float(np.logical_and(a, b).sum() / union)
+
+
+def _create_remover(backend, quantize, onnx_model_path=None, model_path=None):
+    if backend == "rmbg":
+        from rmbg_remover import RMBGRemover
+        remover = RMBGRemover(quantize=quantize, model_path=model_path)
+    else:
+        from rmbg_onnx import DEFAULT_ONNX_PATH, RMBGOnnxRemover
+        remover = RMBGOnnxRemover(onnx_model_path or DEFAULT_ONNX_PATH, quantize=quantize)
+    remover._load_model()
+    return remover
+
+
+def verify(image_paths, backend="rmbg-onnx", onnx_model_path=None, model_path=None):
+    """Compare INT8 masks with the FP32 model on a sample set.
+
+    Args:
+        image_paths: Paths of sample images
+        backend: "rmbg" or "rmbg-onnx"
+        onnx_model_path: Exported FP32 ONNX model (rmbg-onnx only)
+        model_path: Offline RMBG-2.0 bundle directory (rmbg only)
+
+    Returns:
+        Dict with per-image IoUs and the mean time per image of each model
+
+    Raises:
+        ValueError: If none of the sample images can be read
+    """
+    import cv2
+
+    images = []
+    for path in image_paths:
+        image = cv2.imread(str(path))
+        if image is None:
+            print(f"Skipping unreadable image {path}")
+            continue
+        images.append((path, image))
+    if not images:
+        raise ValueError("None of the sample images could be read")
+
+    report = {"ious": [], "seconds": {}}
+    masks = {}
+    for quantize in (False, True):
+        label = "int8" if quantize else "fp32"
+        remover = _create_remover(backend, quantize, onnx_model_path, model_path)
+        remover.batch_remove_background([images[0][1]], batch_size=1)  # Warm-up
+
+        start = time.perf_counter()
+        masks[label] = [remover.batch_remove_background([image], batch_size=1)[0][:, :, 3] / 255.0
+                        for _, image in images]
+        report["seconds"][label] = (time.perf_counter() - start) / len(images)
+
+    for (path, _), fp32, int8 in zip(images, masks["fp32"], masks["int8"]):
+        report["ious"].append((path, mask_iou(fp32, int8)))
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="INT8 quantization tools for RMBG-2.0")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    onnx_parser = subparsers.add_parser("quantize-onnx", help="Write an INT8 copy of the ONNX model")
+    onnx_parser.add_argument("--onnx-model", default=None, help="Exported FP32 ONNX model")
+    onnx_parser.add_argument("--output", help="INT8 output path (default: <name>.int8.onnx)")
+
+    verify_parser = subparsers.add_parser(
+        "verify", help="Report mask IoU and speed of INT8 vs FP32 on sample images")
+    verify_parser.add_argument("images", nargs="+", help="Sample images")
+    verify_parser.add_argument("--backend", choices=["rmbg", "rmbg-onnx"], default="rmbg-onnx")
+    verify_parser.add_argument("--onnx-model", default=None, help="Exported FP32 ONNX model")
+    verify_parser.add_argument("--model-path", metavar="DIR",
+                               help="Offline RMBG-2.0 bundle (--backend rmbg)")
+    verify_parser.add_argument("--min-iou", type=float, default=0.95,
+                               help="Lowest acceptable mean IoU (default: 0.95)")
+
+    args = parser.parse_args()
+
+    if args.command == "quantize-onnx":
+        from rmbg_onnx import DEFAULT_ONNX_PATH
+        quantize_onnx_model(args.onnx_model or DEFAULT_ONNX_PATH, args.output)
+        return 0
+
+    try:
+        report = verify(args.images, args.backend, args.onnx_model, args.model_path)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return 1
+    for path, iou in report["ious"]:
+        print(f"{Path(path).name}: IoU {iou:.4f}")
+
+    mean_iou = float(np.mean([iou for _, iou in report["ious"]]))
+    fp32, int8 = report["seconds"]["fp32"], report["seconds"]["int8"]
+    print(f"\nMean IoU: {mean_iou:.4f} (min {min(iou for _, iou in report['ious']):.4f})")
+    print(f"FP32: {fp32 * 1000:.0f} ms/image, INT8: {int8 * 1000:.0f} ms/image "
+          f"({fp32 / int8:.2f}x)")
+
+    if mean_iou < args.min_iou:
+        print(f"[FAILED] Mean IoU below {args.min_iou}")
+        return 1
+    print("[OK] INT8 masks within tolerance")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
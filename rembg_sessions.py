@@ -0,0 +1,90 @@
+"""Process-wide rembg sessions, created once per model name."""
+
+import os
+import threading
+
+DEFAULT_REMBG_MODEL = "u2net"
+
+_sessions = {}
+_lock = threading.Lock()
+_num_threads = None
+
+
+def set_num_threads(num_threads):
+    """Set the ONNX Runtime thread count used for sessions created afterwards.
+
+    Sessions that already exist keep the settings they were created with.
+
+    Args:
+        num_threads: Intra/inter-op thread count, or None for onnxruntime defaults
+    """
+    global _num_threads
+    _num_threads = int(num_threads) if num_threads else None
+
+
+def get_session(model_name=DEFAULT_REMBG_MODEL):
+    """Return the shared rembg session for a model, creating it on first use.
+
+    Args:
+        model_name: rembg model name (e.g. "u2net", "isnet-general-use")
+
+    Returns:
+        rembg session object to pass as ``session=`` to ``rembg.remove``
+
+    Raises:
+        ImportError: If rembg is not installed
+    """
+    session = _sessions.get(model_name)
+    if session is not None:
+        return session
+
+    from rembg import new_session
+
+    with _lock:
+        if model_name not in _sessions:
+            _sessions[model_name] = _create_session(new_session, model_name)
+        return _sessions[model_name]
+
+
+def _create_session(new_session, model_name):
+    """Create a rembg session honouring the configured thread count."""
+    if _num_threads is None:
+        return new_session(model_name)
+
+    # rembg builds its onnxruntime SessionOptions from OMP_NUM_THREADS
+    previous = os.environ.get("OMP_NUM_THREADS")
+    os.environ["OMP_NUM_THREADS"] = str(_num_threads)
+    try:
+        return new_session(model_name)
+    finally:
+        if previous is None:
+            del os.environ["OMP_NUM_THREADS"]
+        else:
+            os.environ["OMP_NUM_THREADS"] = previous
+
+
+def session_thread_settings(model_name=DEFAULT_REMBG_MODEL):
+    """Return the onnxruntime thread settings of an existing session.
+
+    Args:
+        model_name: rembg model name
+
+    Returns:
+        Dict with "intra_op_num_threads" and "inter_op_num_threads"
+        (0 means onnxruntime picks), or None if no session exists yet
+    """
+    session = _sessions.get(model_name)
+    if session is None:
+        return None
+
+    options = session.inner_session.get_session_options()
+    return {
+        "intra_op_num_threads": options.intra_op_num_threads,
+        "inter_op_num_threads": options.inter_op_num_threads,
+    }
+
+
+def clear_sessions():
+    """Drop all cached sessions (mainly useful to apply new thread settings)."""
+    with _lock:
+        _sessions.clear()
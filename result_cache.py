@@ -0,0 +1,218 @@
+"""Content-addressed cache of processed images.
+
+Results are keyed by a hash of the decoded pixels plus the processing
+options and output format, so the same image under another name or in
+another batch is not processed twice. Encoded output bytes are kept in
+an in-memory LRU tier and an optional on-disk tier, each with a byte
+budget and least-recently-used eviction.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+
+def make_key(image, options, extension):
+    """Build the cache key of a decoded image and its processing options.
+
+    Args:
+        image: Decoded image (numpy array)
+        options: process_image options (JSON-serialisable dict)
+        extension: Output file extension, e.g. ".png"
+
+    Returns:
+        Hex digest identifying the result
+    """
+    digest = hashlib.blake2b(digest_size=32)
+    digest.update(f"{image.shape}|{image.dtype.str}|{extension.lower()}|".encode())
+    digest.update(json.dumps(options, sort_keys=True).encode())
+    digest.update(memoryview(image).cast("B") if image.flags.c_contiguous
+                  else image.tobytes())
+    return digest.hexdigest()
+
+
+class ResultCache:
+    """Two-tier (memory + disk) LRU cache of encoded results."""
+
+    def __init__(self, cache_dir=None, memory_bytes=256 * 1024 * 1024,
+                 disk_bytes=1024 * 1024 * 1024):
+        """Initialize the cache.
+
+        Args:
+            cache_dir: Directory of the on-disk tier (None = memory only)
+            memory_bytes: Byte budget of the in-memory tier
+            disk_bytes: Byte budget of the on-disk tier
+        """
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+
+        self._memory = OrderedDict()
+        self._memory_used = 0
+        self._disk = OrderedDict()
+        self._disk_used = 0
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+
+        if self.cache_dir is not None:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._scan_disk()
+
+    def _scan_disk(self):
+        """Index existing disk entries, oldest use first."""
+        entries = []
+        for path in self.cache_dir.glob("*/*"):
+            if path.suffix == ".tmp":
+                continue
+            try:
+                stat = path.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, path.name, stat.st_size))
+        for _, key, size in sorted(entries):
+            self._disk[key] = size
+            self._disk_used += size
+        self._evict_disk()
+
+    def _disk_path(self, key):
+        return self.cache_dir / key[:2] / key
+
+    def get(self, key):
+        """Return the cached bytes for a key, or None."""
+        with self._lock:
+            data = self._memory.get(key)
+            if data is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return data
+
+        # Other processes may share the disk tier, so look even if unindexed
+        if self.cache_dir is not None:
+            path = self._disk_path(key)
+            try:
+                data = path.read_bytes()
+                os.utime(path)  # mtime records last use across runs
+            except OSError:
+                data = None
+            with self._lock:
+                if data is None:
+                    self._forget_disk(key)
+                else:
+                    if key not in self._disk:
+                        self._disk[key] = len(data)
+                        self._disk_used += len(data)
+                    self._disk.move_to_end(key)
+                    self._put_memory(key, data)
+                    self.hits += 1
+                    return data
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, data):
+        """Store encoded bytes under a key in both tiers."""
+        with self._lock:
+            self._put_memory(key, data)
+
+        if self.cache_dir is None or len(data) > self.disk_bytes:
+            return
+
+        path = self._disk_path(key)
+        path.parent.mkdir(exist_ok=True)
+        tmp_path = path.with_name(f"{key}.{os.getpid()}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if key not in self._disk:
+                self._disk[key] = len(data)
+                self._disk_used += len(data)
+            self._disk.move_to_end(key)
+            self._evict_disk()
+
+    def get_or_compute(self, key, compute):
+        """Return cached bytes for a key, computing them at most once.
+
+        Concurrent callers asking for the same key while it is being
+        computed wait for that computation instead of repeating it.
+
+        Args:
+            key: Cache key from make_key
+            compute: Callable returning the encoded bytes
+
+        Returns:
+            Tuple of (bytes, cached) where cached tells whether the bytes
+            came from the cache (or another caller's computation)
+        """
+        while True:
+            data = self.get(key)
+            if data is not None:
+                return data, True
+
+            with self._lock:
+                if key in self._memory:
+                    continue  # Finished by another caller since our lookup
+                event = self._inflight.get(key)
+                if event is None:
+                    event = self._inflight[key] = threading.Event()
+                    owner = True
+                else:
+                    owner = False
+
+            if not owner:
+                event.wait()
+                continue  # The owner may have failed; then we compute it ourselves
+
+            try:
+                data = compute()
+                self.put(key, data)
+                return data, False
+            finally:
+                with self._lock:
+                    del self._inflight[key]
+                event.set()
+
+    def _put_memory(self, key, data):
+        # Caller holds the lock
+        if len(data) > self.memory_bytes:
+            return
+        if key in self._memory:
+            self._memory_used -= len(self._memory.pop(key))
+        self._memory[key] = data
+        self._memory_used += len(data)
+        while self._memory_used > self.memory_bytes:
+            _, evicted = self._memory.popitem(last=False)
+            self._memory_used -= len(evicted)
+
+    def _forget_disk(self, key):
+        # Caller holds the lock
+        size = self._disk.pop(key, None)
+        if size is not None:
+            self._disk_used -= size
+
+    def _evict_disk(self):
+        # Caller holds the lock
+        while self._disk_used > self.disk_bytes and self._disk:
+            key, size = self._disk.popitem(last=False)
+            self._disk_used -= size
+            try:
+                self._disk_path(key).unlink()
+            except OSError:
+                pass
+
+    def stats(self):
+        """Return hit/miss counts and the bytes used by each tier."""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_bytes": self._memory_used,
+                "disk_bytes": self._disk_used,
+            }
@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+"""BRIA RMBG-2.0 background removal on ONNX Runtime (CPU).
+
+The inference path only needs onnxruntime, OpenCV and NumPy, so it
+starts without importing torch or transformers. Exporting the model
+(and comparing against it) still requires the PyTorch stack.
+
+Usage:
+  python rmbg_onnx.py export --output models/rmbg-2.0.onnx
+  python rmbg_onnx.py export --output models/rmbg-2.0.onnx --model-path models/rmbg-2.0
+  python rmbg_onnx.py compare images/*.jpg --onnx-model models/rmbg-2.0.onnx
+"""
+
+import argparse
+import os
+import sys
+from pathlib import Path
+
+import numpy as np
+
+from rmbg_common import (MODEL_RESOLUTION, apply_mask, group_by_resolution, preprocess_batch,
+                         sigmoid)
+
+# Default location of the exported model
+DEFAULT_ONNX_PATH = os.path.join("models", "rmbg-2.0.onnx")
+
+# Images per forward pass in batch_remove_background
+DEFAULT_BATCH_SIZE = 8
+
+
+def export_onnx(output_path=DEFAULT_ONNX_PATH, resolution=MODEL_RESOLUTION, opset=17,
+                model_path=None):
+    """Export the RMBG-2.0 PyTorch model to ONNX.
+
+    The exported graph takes a [N, 3, H, W] float32 batch named "input"
+    and returns the mask logits [N, 1, H, W] named "logits". Batch size
+    and spatial size are dynamic, so one file serves every --resolution.
+
+    Args:
+        output_path: Where to write the .onnx file
+        resolution: Square input resolution used for tracing
+        opset: ONNX opset version
+        model_path: Offline RMBG-2.0 bundle to export instead of the
+            Hugging Face model (see model_bundle.py)
+
+    Returns:
+        Path of the written model
+    """
+    import torch
+    from rmbg_remover import RMBGRemover
+
+    remover = RMBGRemover(model_path=model_path)
+    remover._load_model()
+    model = remover.model.float().cpu().eval()
+
+    class _LogitsOnly(torch.nn.Module):
+        """Wraps the model so the graph has a single logits output."""
+
+        def __init__(self, inner):
+            super().__init__()
+            self.inner = inner
+
+        def forward(self, x):
+            output = self.inner(x)
+            # Same output selection as RMBGRemover._predict
+            if isinstance(output, (list, tuple)):
+                output = output[0]
+            return output
+
+    output_path = Path(output_path)
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+
+    print(f"Exporting RMBG-2.0 to {output_path} (opset {opset})...")
+    dummy = torch.zeros(1, 3, resolution, resolution)
+    with torch.no_grad():
+        torch.onnx.export(
+            _LogitsOnly(model), dummy, str(output_path),
+            input_names=["input"], output_names=["logits"],
+            dynamic_axes={"input": {0: "batch", 2: "height", 3: "width"},
+                          "logits": {0: "batch", 2: "height", 3: "width"}},
+            opset_version=opset,
+        )
+    print("Export complete.")
+    return output_path
+
+
+class RMBGOnnxRemover:
+    """Handles background removal using an ONNX export of RMBG-2.0."""
+
+    def __init__(self, model_path=DEFAULT_ONNX_PATH, quantize=False, resolution=MODEL_RESOLUTION):
+        """Initialize the ONNX Runtime remover.
+
+        Args:
+            model_path: Path to the exported .onnx model
+            quantize: Use an INT8 copy of the model (created on first use)
+            resolution: Square inference resolution, or "auto" to pick one
+                from each image's size (see rmbg_common.pick_resolution)
+        """
+        self.model_path = str(model_path)
+        self.quantize = quantize
+        self.resolution = resolution
+        self.session = None
+        self.input_name = None
+
+    def _load_model(self):
+        """Create the ONNX Runtime session (lazy loading)."""
+        if self.session is not None:
+            return
+
+        import onnxruntime as ort
+
+        if not os.path.exists(self.model_path):
+            raise FileNotFoundError(
+                f"ONNX model not found: {self.model_path}\n"
+                "Export it first: python rmbg_onnx.py export --output " + self.model_path
+            )
+
+        model_path = self.model_path
+        if self.quantize:
+            from quantization import int8_onnx_path, quantize_onnx_model
+            model_path = str(int8_onnx_path(self.model_path))
+            if not os.path.exists(model_path):
+                quantize_onnx_model(self.model_path, model_path)
+
+        print(f"  - Loading RMBG-2.0 ONNX model from {model_path}...")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # Respect the run's thread budget (see thread_budget.py)
+        threads = os.environ.get("OMP_NUM_THREADS")
+        if threads:
+            options.intra_op_num_threads = int(threads)
+
+        self.session = ort.InferenceSession(model_path, sess_options=options,
+                                            providers=["CPUExecutionProvider"])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+
+        # Models exported with a fixed spatial size only run at that size
+        height = model_input.shape[2]
+        if isinstance(height, int) and self.resolution != height:
+            print(f"  - Warning: {model_path} was exported for {height}x{height} input only; "
+                  f"re-export it to use --resolution {self.resolution}")
+            self.resolution = height
+
+    def _predict(self, batch):
+        """Run one forward pass on a [N, 3, H, W] float32 batch.
+
+        Returns:
+            Array of N foreground probability masks at model resolution
+        """
+        logits = self.session.run(None, {self.input_name: batch})[0]
+        if logits.ndim == 4:
+            # Shape: [batch, channels, height, width]
+            logits = logits[:, 0]
+        return sigmoid(logits.reshape(batch.shape[0], *logits.shape[-2:]))
+
+    def remove_background(self, image):
+        """Remove background using the ONNX model.
+
+        Args:
+            image: numpy array of the image (BGR format from cv2)
+
+        Returns:
+            Image with transparent background (BGRA format)
+        """
+        return self.batch_remove_background([image], batch_size=1)[0]
+
+    def predict_masks(self, images, batch_size=DEFAULT_BATCH_SIZE):
+        """Return foreground probability masks at model resolution."""
+        self._load_model()
+
+        masks = [None] * len(images)
+        for resolution, indices in group_by_resolution(images, self.resolution).items():
+            for start in range(0, len(indices), batch_size):
+                chunk = indices[start:start + batch_size]
+                batch = preprocess_batch([images[i] for i in chunk], resolution)
+                for i, mask in zip(chunk, self._predict(batch)):
+                    masks[i] = mask
+        return masks
+
+    def batch_remove_background(self, images, batch_size=DEFAULT_BATCH_SIZE):
+        """Remove background from multiple images with batched inference.
+
+        Args:
+            images: List of numpy arrays (BGR format)
+            batch_size: Maximum number of images per forward pass
+
+        Returns:
+            List of images with transparent backgrounds (BGRA format)
+        """
+        masks = self.predict_masks(images, batch_size=batch_size)
+        return [apply_mask(img, mask) for img, mask in zip(images, masks)]
+
+    def is_available(self):
+        """Check if onnxruntime is installed and the model file exists.
+
+        Returns:
+            bool: True if the backend can be used
+        """
+        try:
+            import onnxruntime
+        except ImportError:
+            return False
+        return os.path.exists(self.model_path)
+
+
+def compare_backends(image_paths, onnx_path=DEFAULT_ONNX_PATH, model_path=None):
+    """Compare ONNX masks with the PyTorch model on a set of images.
+
+    Args:
+        image_paths: Paths of sample images
+        onnx_path: Path to the exported .onnx model
+        model_path: Offline RMBG-2.0 bundle for the PyTorch side
+
+    Returns:
+        List of (path, max_abs_diff, mean_abs_diff, alpha_mean_abs_diff)
+        tuples: the first two compare model outputs on identical input
+        tensors (0..1 masks), the last compares the final alpha channels
+        including each backend's own preprocessing (0..1 scale)
+    """
+    import cv2
+    import torch
+    from rmbg_remover import RMBGRemover
+
+    torch_remover = RMBGRemover(model_path=model_path)
+    torch_remover._load_model()
+    onnx_remover = RMBGOnnxRemover(onnx_path)
+
+    results = []
+    for path in image_paths:
+        image = cv2.imread(str(path))
+        if image is None:
+            print(f"Skipping unreadable image {path}")
+            continue
+
+        # Feed both backends the same input so only the runtimes differ
+        batch = preprocess_batch([image])
+        torch_mask = torch_remover._predict(torch.from_numpy(batch))[0]
+        onnx_remover._load_model()
+        onnx_mask = onnx_remover._predict(batch)[0]
+
+        diff = np.abs(torch_mask - onnx_mask)
+
+        # End to end, as used by process_image
+        torch_alpha = torch_remover.remove_background(image)[:, :, 3].astype(np.float32)
+        onnx_alpha = onnx_remover.remove_background(image)[:, :, 3].astype(np.float32)
+        alpha_diff = np.abs(torch_alpha - onnx_alpha).mean() / 255.0
+
+        results.append((path, float(diff.max()), float(diff.mean()), float(alpha_diff)))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="RMBG-2.0 ONNX Runtime tools")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    export_parser = subparsers.add_parser("export", help="Export RMBG-2.0 to ONNX")
+    export_parser.add_argument("--output", default=DEFAULT_ONNX_PATH, help="Output .onnx path")
+    export_parser.add_argument("--opset", type=int, default=17, help="ONNX opset version")
+    export_parser.add_argument("--model-path", metavar="DIR",
+                               help="Export from an offline bundle instead of Hugging Face")
+
+    compare_parser = subparsers.add_parser(
+        "compare", help="Compare ONNX and PyTorch masks on sample images")
+    compare_parser.add_argument("images", nargs="+", help="Sample images")
+    compare_parser.add_argument("--onnx-model", default=DEFAULT_ONNX_PATH, help="ONNX model path")
+    compare_parser.add_argument("--tolerance", type=float, default=0.02,
+                                help="Largest acceptable mean absolute mask difference")
+    compare_parser.add_argument("--model-path", metavar="DIR",
+                                help="Offline RMBG-2.0 bundle for the PyTorch model")
+
+    args = parser.parse_args()
+
+    if args.command == "export":
+        export_onnx(args.output, opset=args.opset, model_path=args.model_path)
+        return 0
+
+    results = compare_backends(args.images, args.onnx_model, args.model_path)
+    worst = 0.0
+    for path, max_diff, mean_diff, alpha_diff in results:
+        print(f"{Path(path).name}: model max |diff| {max_diff:.4f}, mean |diff| {mean_diff:.5f}; "
+              f"alpha mean |diff| {alpha_diff:.5f}")
+        worst = max(worst, mean_diff, alpha_diff)
+
+    if worst > args.tolerance:
+        print(f"[FAILED] Mean mask difference {worst:.5f} exceeds {args.tolerance}")
+        return 1
+    print(f"[OK] ONNX masks match PyTorch within {args.tolerance}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,17 +4,30 @@ import cv2
 import numpy as np
 from PIL import Image
 import torch
-from torchvision import transforms
+from rmbg_common import MODEL_RESOLUTION, apply_mask, group_by_resolution, preprocess_batch
+
+# Images per forward pass in batch_remove_background
+DEFAULT_BATCH_SIZE = 8
 
 
 class RMBGRemover:
     """Handles background removal using BRIA RMBG-2.0 model."""
 
-    def __init__(self):
-        """Initialize RMBG-2.0 background remover."""
+    def __init__(self, quantize=False, resolution=MODEL_RESOLUTION, model_path=None):
+        """Initialize RMBG-2.0 background remover.
+
+        Args:
+            quantize: Run a dynamically INT8-quantized model on the CPU
+            resolution: Square inference resolution, or "auto" to pick one
+                from each image's size (see rmbg_common.pick_resolution)
+            model_path: Local bundle directory (see model_bundle.py) to load
+                instead of downloading from Hugging Face
+        """
+        self.quantize = quantize
+        self.resolution = resolution
+        self.model_path = model_path
         self.model = None
         self.device = None
-        self.transform = None
 
     def _load_model(self):
         """Load RMBG-2.0 model from Hugging Face (lazy loading)."""
@@ -25,31 +38,32 @@ class RMBGRemover:
             from transformers import AutoModelForImageSegmentation
             import os
 
-            print("  - Loading RMBG-2.0 model (first run may take a few minutes)...")
-
-            # Determine device
-            self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-            print(f"  - Using device: {self.device}")
-
-            # Get Hugging Face token from environment
-            hf_token = os.environ.get('HF_TOKEN') or os.environ.get('HUGGING_FACE_HUB_TOKEN')
-
-            # Load model
-            self.model = AutoModelForImageSegmentation.from_pretrained(
-                'briaai/RMBG-2.0',
-                trust_remote_code=True,
-                token=hf_token
-            ).eval().to(self.device)
-
-            # Define preprocessing transform
-            self.transform = transforms.Compose([
-                transforms.Resize((1024, 1024)),
-                transforms.ToTensor(),
-                transforms.Normalize(
-                    mean=[0.485, 0.456, 0.406],
-                    std=[0.229, 0.224, 0.225]
-                )
-            ])
+            # Determine device (quantized kernels are CPU-only)
+            self.device = 'cuda' if torch.cuda.is_available() and not self.quantize else 'cpu'
+
+            if self.model_path:
+                from model_bundle import load_bundle
+                print(f"  - Loading RMBG-2.0 model from {self.model_path} (memory-mapped)...")
+                print(f"  - Using device: {self.device}")
+                self.model = load_bundle(self.model_path).to(self.device)
+            else:
+                print("  - Loading RMBG-2.0 model (first run may take a few minutes)...")
+                print(f"  - Using device: {self.device}")
+
+                # Get Hugging Face token from environment
+                hf_token = os.environ.get('HF_TOKEN') or os.environ.get('HUGGING_FACE_HUB_TOKEN')
+
+                # Load model
+                self.model = AutoModelForImageSegmentation.from_pretrained(
+                    'briaai/RMBG-2.0',
+                    trust_remote_code=True,
+                    token=hf_token
+                ).eval().to(self.device)
+
+            if self.quantize:
+                from quantization import quantize_torch_model
+                print("  - Quantizing model to INT8...")
+                self.model = quantize_torch_model(self.model)
 
             print("  - Model loaded successfully!")
 
@@ -81,25 +95,24 @@ class RMBGRemover:
         Returns:
             Image with transparent background (BGRA format)
         """
-        # Load model if not already loaded
-        self._load_model()
+        return self.batch_remove_background([image], batch_size=1)[0]
 
-        # Convert BGR to RGB
-        if len(image.shape) == 2:  # Grayscale
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_GRAY2RGB)
-        else:
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+    def _preprocess(self, images, resolution=MODEL_RESOLUTION):
+        """Convert BGR images into a normalized model input tensor [N, 3, H, W].
 
-        # Convert to PIL Image
-        pil_image = Image.fromarray(image_rgb)
-        original_size = pil_image.size
+        The tensor shares memory with the NumPy batch built by
+        rmbg_common.preprocess_batch (no PIL or torchvision round-trip).
+        """
+        return torch.from_numpy(preprocess_batch(images, resolution))
 
-        # Preprocess image
-        input_tensor = self.transform(pil_image).unsqueeze(0).to(self.device)
+    def _predict(self, batch):
+        """Run one forward pass on a [N, 3, H, W] batch.
 
-        # Run inference
+        Returns:
+            Array of N foreground probability masks at model resolution
+        """
         with torch.no_grad():
-            output = self.model(input_tensor)
+            output = self.model(batch.to(self.device))
 
             # Handle different output formats
             if isinstance(output, (list, tuple)):
@@ -109,21 +122,12 @@ class RMBGRemover:
             # Apply sigmoid to get probabilities
             if len(output.shape) == 4:
                 # Shape: [batch, channels, height, width]
-                mask = torch.sigmoid(output[0, 0]).cpu().numpy()
+                masks = torch.sigmoid(output[:, 0])
             else:
                 # Squeeze extra dimensions if needed
-                mask = torch.sigmoid(output.squeeze()).cpu().numpy()
-
-        # Resize mask back to original size
-        mask_pil = Image.fromarray((mask * 255).astype(np.uint8))
-        mask_pil = mask_pil.resize(original_size, Image.LANCZOS)
-        mask_resized = np.array(mask_pil)
+                masks = torch.sigmoid(output.reshape(batch.shape[0], *output.shape[-2:]))
 
-        # Create BGRA image with alpha channel
-        bgra = cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
-        bgra[:, :, 3] = mask_resized
-
-        return bgra
+            return masks.cpu().numpy()
 
     def remove_background_pil(self, pil_image):
         """Remove background from PIL Image.
@@ -145,19 +149,32 @@ class RMBGRemover:
         result_rgb = cv2.cvtColor(result_bgra, cv2.COLOR_BGRA2RGBA)
         return Image.fromarray(result_rgb)
 
-    def batch_remove_background(self, images):
-        """Remove background from multiple images (batch processing).
+    def batch_remove_background(self, images, batch_size=DEFAULT_BATCH_SIZE):
+        """Remove background from multiple images with batched inference.
+
+        Images are grouped by inference resolution; within a group every
+        image is resized to the same square size, so up to `batch_size` of
+        them are stacked into one [N, 3, H, W] tensor and run in a single
+        forward pass. Masks are resized back to each image's own size
+        afterwards.
 
         Args:
             images: List of numpy arrays (BGR format)
+            batch_size: Maximum number of images per forward pass
 
         Returns:
             List of images with transparent backgrounds (BGRA format)
         """
-        results = []
-        for img in images:
-            result = self.remove_background(img)
-            results.append(result)
+        self._load_model()
+
+        results = [None] * len(images)
+        for resolution, indices in group_by_resolution(images, self.resolution).items():
+            for start in range(0, len(indices), batch_size):
+                chunk = indices[start:start + batch_size]
+                batch = self._preprocess([images[i] for i in chunk], resolution)
+                masks = self._predict(batch)
+                for i, mask in zip(chunk, masks):
+                    results[i] = apply_mask(images[i], mask)
         return results
 
     def is_available(self):
@@ -0,0 +1,154 @@
+"""Shared-memory transport for image arrays between pipeline processes.
+
+Instead of pickling multi-megabyte frames, processes exchange small
+FrameHandle tuples (slot, shape, dtype) that point into a ring of
+fixed-size slots inside one multiprocessing.shared_memory block.
+
+Lifetime rules:
+  * The parent creates the ring (``SharedFrameRing.create``), hands out
+    slots with ``acquire``/``release`` and calls ``unlink`` when done.
+  * Workers attach once (``SharedFrameRing.attach``) and only read or
+    write the slots they were given; they ``close`` on exit.
+  * A slot belongs to exactly one in-flight image from ``acquire`` until
+    ``release``; views into it must not be used after it is released.
+"""
+
+import queue
+import sys
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import numpy as np
+
+# Reference to a frame stored in a ring slot
+FrameHandle = namedtuple("FrameHandle", ["slot", "shape", "dtype"])
+
+# Everything a worker needs to attach to an existing ring
+RingSpec = namedtuple("RingSpec", ["name", "slots", "slot_bytes"])
+
+
+class SharedFrameRing:
+    """A ring of equally sized frame slots in one shared memory block."""
+
+    def __init__(self, shm, slots, slot_bytes, owner):
+        self._shm = shm
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        self._owner = owner
+        self._free = queue.Queue()
+        if owner:
+            for slot in range(slots):
+                self._free.put(slot)
+
+    @classmethod
+    def create(cls, slots, slot_bytes):
+        """Allocate a new ring (parent process).
+
+        Args:
+            slots: Number of frames that can be in flight at once
+            slot_bytes: Capacity of each slot in bytes
+
+        Returns:
+            SharedFrameRing owning the shared memory block
+        """
+        shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        return cls(shm, slots, slot_bytes, owner=True)
+
+    @classmethod
+    def attach(cls, spec):
+        """Attach to a ring created by another process (worker process).
+
+        Args:
+            spec: RingSpec from the owning ring's ``spec`` property
+
+        Returns:
+            SharedFrameRing view of the same shared memory block
+        """
+        if sys.version_info >= (3, 13):
+            # Only the owner should unlink the block when it exits
+            shm = shared_memory.SharedMemory(name=spec.name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=spec.name)
+        return cls(shm, spec.slots, spec.slot_bytes, owner=False)
+
+    @property
+    def spec(self):
+        """RingSpec that workers use to attach to this ring."""
+        return RingSpec(self._shm.name, self.slots, self.slot_bytes)
+
+    def acquire(self, timeout=None):
+        """Reserve a free slot (owner only). Blocks until one is available."""
+        return self._free.get(timeout=timeout)
+
+    def release(self, slot):
+        """Return a slot to the free list (owner only)."""
+        self._free.put(slot)
+
+    def fits(self, array):
+        """Check whether an array fits into one slot."""
+        return array.nbytes <= self.slot_bytes
+
+    def write(self, slot, array):
+        """Copy an array into a slot.
+
+        Returns:
+            FrameHandle describing the stored frame
+        """
+        if not self.fits(array):
+            raise ValueError(f"Frame of {array.nbytes} bytes does not fit "
+                             f"into a {self.slot_bytes}-byte slot")
+        view = self._view(slot, array.shape, array.dtype)
+        view[...] = array
+        return FrameHandle(slot, array.shape, array.dtype.str)
+
+    def view(self, handle):
+        """Return a zero-copy array view of a stored frame."""
+        return self._view(handle.slot, handle.shape, np.dtype(handle.dtype))
+
+    def read(self, handle):
+        """Return a private copy of a stored frame."""
+        return self.view(handle).copy()
+
+    def _view(self, slot, shape, dtype):
+        if not 0 <= slot < self.slots:
+            raise IndexError(f"Slot {slot} out of range")
+        return np.ndarray(shape, dtype=dtype, buffer=self._shm.buf,
+                          offset=slot * self.slot_bytes)
+
+    def close(self):
+        """Detach from the shared memory block (views become invalid)."""
+        self._shm.close()
+
+    def unlink(self):
+        """Close and destroy the shared memory block (owner only)."""
+        self._shm.close()
+        if self._owner:
+            self._shm.unlink()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._owner:
+            self.unlink()
+        else:
+            self.close()
+
+
+def pack(ring, slot, array):
+    """Store an array in a slot if possible.
+
+    Returns:
+        FrameHandle, or the array itself when there is no ring or it does
+        not fit (it is then pickled as usual)
+    """
+    if ring is None or slot is None or not ring.fits(array):
+        return array
+    return ring.write(slot, array)
+
+
+def unpack(ring, obj):
+    """Turn the result of ``pack`` back into an array (zero-copy for handles)."""
+    if isinstance(obj, FrameHandle):
+        return ring.view(obj)
+    return obj
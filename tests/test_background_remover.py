@@ -0,0 +1,44 @@
+"""Tests for BackgroundRemover."""
+
+import unittest
+
+import numpy as np
+
+from background_remover import BackgroundRemover
+
+
+class _StubRegistry:
+    """Hands out one stub remover per method."""
+
+    def __init__(self):
+        self.removers = {}
+
+    def get(self, method):
+        return self.removers.setdefault(method, _StubRemover(method))
+
+
+class _StubRemover:
+    def __init__(self, method):
+        self.method = method
+
+    def batch_remove_background(self, images, batch_size=8):
+        return [self.method for _ in images]
+
+
+class MicroBatchQueueTest(unittest.TestCase):
+    def test_each_method_has_its_own_queue(self):
+        remover = BackgroundRemover(registry=_StubRegistry(), micro_batch_size=4,
+                                    micro_batch_wait_ms=1)
+        image = np.zeros((4, 4, 3), dtype=np.uint8)
+        try:
+            self.assertEqual(remover._rmbg_backend("rmbg").remove_background(image), "rmbg")
+            self.assertEqual(remover._rmbg_backend("rmbg-onnx").remove_background(image),
+                             "rmbg-onnx")
+            self.assertIs(remover._rmbg_backend("rmbg"), remover.inference_queues["rmbg"])
+        finally:
+            for inference_queue in remover.inference_queues.values():
+                inference_queue.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,37 @@
+"""Tests for the purifier daemon client."""
+
+import importlib
+import os
+import socket
+import unittest
+from unittest import mock
+
+import daemon
+
+
+class PlatformSupportTest(unittest.TestCase):
+    def test_import_without_getuid(self):
+        getuid = getattr(os, "getuid", None)
+        if getuid is not None:
+            del os.getuid
+        try:
+            module = importlib.reload(daemon)
+            self.assertTrue(module.default_socket_path().endswith(".sock"))
+        finally:
+            if getuid is not None:
+                os.getuid = getuid
+            importlib.reload(daemon)
+
+    def test_submit_job_falls_back_without_unix_sockets(self):
+        with mock.patch.object(daemon, "unix_sockets_available", return_value=False):
+            self.assertIsNone(daemon.submit_job("in.png", "out.png", {}, {}))
+
+    def test_submit_job_falls_back_without_daemon(self):
+        if not hasattr(socket, "AF_UNIX"):
+            self.skipTest("Unix domain sockets are not available")
+        missing = os.path.join(os.path.dirname(__file__), "no-such-daemon.sock")
+        self.assertIsNone(daemon.submit_job("in.png", "out.png", {}, {}, socket_path=missing))
+
+
+if __name__ == "__main__":
+    unittest.main()
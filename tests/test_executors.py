@@ -0,0 +1,113 @@
+"""Tests for the directory runners in executors.py."""
+
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import cv2
+import numpy as np
+
+import executors
+from image_processor import ImageProcessor
+
+HYBRID_OPTIONS = {
+    "remove_watermark": False,
+    "remove_background": True,
+    "bg_color": None,
+    "aggressive": False,
+    "use_ai": True,
+    "ai_method": "rembg",
+    "generator": None,
+    "consensus": False,
+}
+
+
+def _fake_remove_with_ai(image, method=None):
+    """Stands in for the AI model: an opaque alpha channel."""
+    return cv2.cvtColor(image, cv2.COLOR_BGR2BGRA)
+
+
+def _make_jobs(directory, count, size=(48, 64)):
+    input_dir = Path(directory) / "in"
+    output_dir = Path(directory) / "out"
+    input_dir.mkdir()
+    output_dir.mkdir()
+    rng = np.random.default_rng(0)
+    jobs = []
+    for i in range(count):
+        path = input_dir / f"{i:03d}.png"
+        cv2.imwrite(str(path), rng.integers(0, 255, (*size, 3), dtype=np.uint8))
+        jobs.append((path, output_dir / path.name))
+    return jobs
+
+
+def _run_with_timeout(generator, timeout=120):
+    """Drain a runner's iterator, failing instead of hanging forever."""
+    results = []
+    thread = threading.Thread(target=lambda: results.extend(generator), daemon=True)
+    thread.start()
+    thread.join(timeout)
+    if thread.is_alive():
+        raise AssertionError(f"Runner did not finish within {timeout} s")
+    return results
+
+
+class HybridExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.processor = ImageProcessor()
+        self.processor.warm_up = lambda **options: None
+        self.processor.background_remover.remove_with_ai = _fake_remove_with_ai
+
+    def test_in_flight_images_stay_within_bound(self):
+        jobs = _make_jobs(self._tmp.name, 30)
+        peak = []
+        real_wait = executors.wait
+
+        def recording_wait(futures, **kwargs):
+            peak.append(len(futures))
+            return real_wait(futures, **kwargs)
+
+        with mock.patch.object(executors, "wait", recording_wait):
+            results = _run_with_timeout(executors.run_hybrid(
+                self.processor, jobs, HYBRID_OPTIONS, workers=2, max_in_flight=6))
+
+        self.assertEqual(len(results), 30)
+        self.assertTrue(all(success for _, success in results))
+        self.assertLessEqual(max(peak), 6)
+
+    def test_shared_memory_ring_with_more_jobs_than_slots(self):
+        jobs = _make_jobs(self._tmp.name, 10)
+        results = _run_with_timeout(executors.run_hybrid(
+            self.processor, jobs, HYBRID_OPTIONS, workers=2, max_in_flight=3,
+            shm_slot_bytes=1024 * 1024))
+
+        self.assertEqual(len(results), 10)
+        self.assertTrue(all(success for _, success in results))
+        for input_file, output_file in jobs:
+            expected = cv2.cvtColor(cv2.imread(str(input_file)), cv2.COLOR_BGR2BGRA)
+            np.testing.assert_array_equal(
+                cv2.imread(str(output_file), cv2.IMREAD_UNCHANGED), expected)
+
+
+class PipelineExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+
+    def test_normal_finish_does_not_set_the_stop_event(self):
+        jobs = _make_jobs(self._tmp.name, 5)
+        stop = threading.Event()
+        options = dict(HYBRID_OPTIONS, remove_background=False, use_ai=False)
+        results = _run_with_timeout(executors.run_pipeline(
+            ImageProcessor(), jobs, options, workers=2, stop=stop))
+
+        self.assertEqual(len(results), 5)
+        self.assertFalse(stop.is_set())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+"""Tests for ImageProcessor."""
+
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import cv2
+import numpy as np
+
+from image_processor import ImageProcessor
+from mask_library import MaskLibrary
+from result_cache import make_key
+from watermark_remover import MaskTemplate
+
+AI_OPTIONS = {
+    "remove_watermark": False,
+    "remove_background": True,
+    "bg_color": None,
+    "aggressive": False,
+    "use_ai": True,
+    "ai_method": "rmbg",
+    "generator": None,
+    "consensus": False,
+}
+
+
+def _cache_key(processor, options):
+    image = np.zeros((8, 8, 3), dtype=np.uint8)
+    return make_key(image, processor._output_options(options, (8, 8)), ".png")
+
+
+class OutputOptionsTest(unittest.TestCase):
+    def test_rmbg_settings_change_the_keys(self):
+        default = _cache_key(ImageProcessor(), AI_OPTIONS)
+        self.assertEqual(default, _cache_key(ImageProcessor(resolution=1024), AI_OPTIONS))
+        self.assertNotEqual(default, _cache_key(ImageProcessor(resolution=512), AI_OPTIONS))
+        self.assertNotEqual(default, _cache_key(ImageProcessor(quantize=True), AI_OPTIONS))
+
+        onnx_options = dict(AI_OPTIONS, ai_method="rmbg-onnx")
+        self.assertNotEqual(_cache_key(ImageProcessor(onnx_model_path="a.onnx"), onnx_options),
+                            _cache_key(ImageProcessor(onnx_model_path="b.onnx"), onnx_options))
+
+    def test_settings_do_not_affect_runs_without_rmbg(self):
+        options = dict(AI_OPTIONS, use_ai=False)
+        self.assertEqual(ImageProcessor(resolution=512, quantize=True)._output_options(options),
+                         options)
+
+    def test_consensus_masks_change_the_keys(self):
+        options = dict(AI_OPTIONS, remove_watermark=True, remove_background=False,
+                       use_ai=False, consensus=True)
+        processor = ImageProcessor()
+        detected = _cache_key(processor, options)
+        run = processor._output_options(options)
+
+        processor.watermark_remover.consensus_masks = {
+            (8, 8): MaskTemplate.from_boxes([(0, 0, 2, 2)], 8, 8)}
+        first = _cache_key(processor, options)
+        first_run = processor._output_options(options)
+        processor.watermark_remover.consensus_masks = {
+            (8, 8): MaskTemplate.from_boxes([(4, 4, 6, 6)], 8, 8)}
+
+        self.assertEqual(len({detected, first, _cache_key(processor, options)}), 3)
+        self.assertEqual(len({str(run), str(first_run),
+                              str(processor._output_options(options))}), 3)
+
+    def test_library_masks_change_the_keys(self):
+        options = dict(AI_OPTIONS, remove_watermark=True, remove_background=False,
+                       use_ai=False, generator="gemini")
+        with tempfile.TemporaryDirectory() as library_dir:
+            processor = ImageProcessor(mask_library=library_dir)
+            library = MaskLibrary(library_dir)
+            default = _cache_key(processor, options)
+            run = processor._output_options(options)
+
+            mask = np.zeros((8, 8), dtype=np.uint8)
+            mask[0:2, 0:2] = 255
+            library.put("gemini", mask)
+            first = _cache_key(processor, options)
+            first_run = processor._output_options(options)
+            mask[4:6, 4:6] = 255
+            library.put("gemini", mask)
+
+            self.assertEqual(len({default, first, _cache_key(processor, options)}), 3)
+            self.assertEqual(len({str(run), str(first_run),
+                                  str(processor._output_options(options))}), 3)
+
+
+class PreforkTest(unittest.TestCase):
+    def test_platform_without_fork_loads_per_worker(self):
+        processor = ImageProcessor()
+        processor.warm_up = mock.Mock()
+        with mock.patch("multiprocessing.get_all_start_methods", return_value=["spawn"]):
+            self.assertIsNone(processor._prepare_prefork(AI_OPTIONS))
+        processor.warm_up.assert_not_called()
+
+
+class ConsensusTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        # Flat frames: detection finds nothing in any of them
+        self.files = []
+        for i in range(4):
+            path = Path(self._tmp.name) / f"{i}.png"
+            cv2.imwrite(str(path), np.full((120, 160, 3), 90 + i, dtype=np.uint8))
+            self.files.append(path)
+
+    def test_no_agreement_keeps_the_generator_mask(self):
+        processor = ImageProcessor()
+        masks = processor._learn_consensus(self.files, 8, generator="gemini")
+        self.assertEqual(masks, {})
+
+        processor.watermark_remover.consensus_masks = masks
+        image = cv2.imread(str(self.files[0]))
+        image[100:115, 140:155] = 255  # Something for the generator mask to remove
+        with_consensus = processor.watermark_remover.smart_remove(
+            image, generator="gemini", consensus=True)
+        generator_only = processor.watermark_remover.smart_remove(image, generator="gemini")
+        np.testing.assert_array_equal(with_consensus, generator_only)
+        self.assertFalse(np.array_equal(with_consensus, image))
+
+
+if __name__ == "__main__":
+    unittest.main()
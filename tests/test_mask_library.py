@@ -0,0 +1,51 @@
+"""Tests for the on-disk watermark mask library."""
+
+import tempfile
+import unittest
+
+import numpy as np
+
+from mask_library import MaskLibrary
+
+
+def _mask(box, size=(120, 160)):
+    mask = np.zeros(size, dtype=np.uint8)
+    x1, y1, x2, y2 = box
+    mask[y1:y2, x1:x2] = 255
+    return mask
+
+
+class MaskLibraryTest(unittest.TestCase):
+    def setUp(self):
+        self._tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self._tmp.cleanup)
+        self.library_dir = self._tmp.name
+
+    def test_round_trip_across_instances(self):
+        mask = _mask((100, 90, 150, 110))
+        MaskLibrary(self.library_dir).put("gemini", mask)
+
+        template = MaskLibrary(self.library_dir).get("gemini", 160, 120)
+        np.testing.assert_array_equal(template.mask, mask)
+        self.assertIsNone(MaskLibrary(self.library_dir).get("gemini", 320, 240))
+
+    def test_empty_masks_are_not_stored(self):
+        library = MaskLibrary(self.library_dir)
+        with self.assertRaises(ValueError):
+            library.put("gemini", np.zeros((120, 160), dtype=np.uint8))
+        self.assertEqual(library.entries(), [])
+        self.assertIsNone(library.get("gemini", 160, 120))
+
+    def test_replaced_masks_reach_open_libraries(self):
+        worker = MaskLibrary(self.library_dir)
+        MaskLibrary(self.library_dir).put("sora", _mask((0, 100, 40, 115)))
+        first = worker.get("sora", 160, 120)
+        self.assertIs(worker.get("sora", 160, 120), first)  # Reused while unchanged
+
+        replacement = _mask((10, 95, 60, 118))
+        MaskLibrary(self.library_dir).put("sora", replacement)
+        np.testing.assert_array_equal(worker.get("sora", 160, 120).mask, replacement)
+
+
+if __name__ == "__main__":
+    unittest.main()
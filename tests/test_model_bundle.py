@@ -0,0 +1,87 @@
+"""Tests for model_bundle.py."""
+
+import json
+import struct
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from model_bundle import _parameters_on_meta, load_safetensors_mmap
+
+try:
+    import torch
+except ImportError:
+    torch = None
+
+
+def _write_safetensors(path, arrays):
+    """Write NumPy arrays in the safetensors format (without the package)."""
+    dtypes = {np.dtype(np.float32): "F32", np.dtype(np.float16): "F16",
+              np.dtype(np.int64): "I64", np.dtype(np.uint8): "U8"}
+    header = {"__metadata__": {"format": "pt"}}
+    offset = 0
+    for name, array in arrays.items():
+        header[name] = {"dtype": dtypes[array.dtype], "shape": list(array.shape),
+                        "data_offsets": [offset, offset + array.nbytes]}
+        offset += array.nbytes
+    header_bytes = json.dumps(header).encode()
+    header_bytes += b" " * (-len(header_bytes) % 8)
+    with open(path, "wb") as f:
+        f.write(struct.pack("<Q", len(header_bytes)))
+        f.write(header_bytes)
+        for array in arrays.values():
+            f.write(np.ascontiguousarray(array).tobytes())
+
+
+@unittest.skipIf(torch is None, "torch is not installed")
+class LoadSafetensorsMmapTest(unittest.TestCase):
+    def test_round_trip(self):
+        rng = np.random.default_rng(0)
+        arrays = {
+            "encoder.weight": rng.standard_normal((16, 8)).astype(np.float32),
+            "encoder.bias": rng.standard_normal(16).astype(np.float16),
+            "steps": np.arange(5, dtype=np.int64),
+            "flags": np.array([[1, 0], [0, 1]], dtype=np.uint8),
+            "empty": np.zeros((0, 3), dtype=np.float32),
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / "model.safetensors"
+            _write_safetensors(path, arrays)
+            tensors = load_safetensors_mmap(path)
+
+            self.assertEqual(set(tensors), set(arrays))
+            for name, array in arrays.items():
+                self.assertEqual(tuple(tensors[name].shape), array.shape, name)
+                np.testing.assert_array_equal(tensors[name].numpy(), array, err_msg=name)
+
+            # Copy-on-write: writing a tensor must not change the file
+            tensors["encoder.weight"].add_(1.0)
+            np.testing.assert_array_equal(
+                load_safetensors_mmap(path)["encoder.weight"].numpy(), arrays["encoder.weight"])
+
+
+@unittest.skipIf(torch is None, "torch is not installed")
+class ParametersOnMetaTest(unittest.TestCase):
+    def test_parameters_are_not_allocated(self):
+        with _parameters_on_meta():
+            model = torch.nn.Sequential(torch.nn.Linear(8, 4), torch.nn.BatchNorm1d(4))
+        self.assertTrue(all(p.is_meta for p in model.parameters()))
+        self.assertFalse(any(b.is_meta for b in model.buffers()))
+        self.assertIsInstance(model[0].weight, torch.nn.Parameter)
+
+        # Modules built afterwards are unaffected
+        self.assertFalse(torch.nn.Linear(2, 2).weight.is_meta)
+
+    def test_assigned_weights_replace_meta_parameters(self):
+        with _parameters_on_meta():
+            model = torch.nn.Linear(3, 2)
+        state = {"weight": torch.ones(2, 3), "bias": torch.zeros(2)}
+        model.load_state_dict(state, assign=True)
+        self.assertFalse(model.weight.is_meta)
+        self.assertEqual(model(torch.ones(1, 3)).tolist(), [[3.0, 3.0]])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,124 @@
+"""Coordinated thread budget for OpenCV, torch and onnxruntime.
+
+OpenCV, torch (RMBG-2.0) and onnxruntime (rembg) each start their own
+thread pools sized to the whole machine. With several workers that
+multiplies into hundreds of competing threads, so a run splits one
+budget (by default the CPUs actually available to the container) over
+its workers and applies the same per-worker limit to all three.
+"""
+
+import math
+import os
+import sys
+
+
+def _cgroup_cpu_limit():
+    """Return the CPU limit from the cgroup quota, or None if unlimited."""
+    # cgroup v2: "<quota> <period>" or "max <period>"
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return int(quota) / int(period)
+        return None
+    except (OSError, ValueError):
+        pass
+
+    # cgroup v1: quota of -1 means unlimited
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return quota / period
+    except (OSError, ValueError):
+        pass
+
+    return None
+
+
+def allowed_cpus():
+    """Return the sorted list of CPU ids this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return sorted(os.sched_getaffinity(0))
+    return list(range(os.cpu_count() or 1))
+
+
+def available_cpus():
+    """Return how many CPUs this process can really use.
+
+    Takes the CPU affinity mask and the container's cgroup CPU quota into
+    account, unlike os.cpu_count().
+    """
+    cpus = len(allowed_cpus())
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, max(1, math.ceil(limit)))
+    return max(1, cpus)
+
+
+def apply_thread_limits(threads, cpu_set=None):
+    """Limit OpenCV, torch and onnxruntime to `threads` threads in this process.
+
+    Args:
+        threads: Number of threads each library may use
+        cpu_set: Optional iterable of CPU ids to pin this process to
+    """
+    import cv2
+    import rembg_sessions
+
+    cv2.setNumThreads(threads)
+
+    # torch and onnxruntime read these when they initialise their pools
+    os.environ["OMP_NUM_THREADS"] = str(threads)
+    os.environ["MKL_NUM_THREADS"] = str(threads)
+    rembg_sessions.set_num_threads(threads)
+
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(threads)
+
+    if cpu_set and hasattr(os, "sched_setaffinity"):
+        os.sched_setaffinity(0, cpu_set)
+
+
+class ThreadBudget:
+    """Splits a total thread budget evenly over a run's workers."""
+
+    def __init__(self, total=None, pin=False):
+        """Initialize the budget.
+
+        Args:
+            total: Total threads for the run (default: available_cpus())
+            pin: Pin each worker process to its own slice of the CPUs
+        """
+        self.cpus = allowed_cpus()
+        self.total = total or available_cpus()
+        self.pin = pin
+
+    def threads_per_worker(self, workers):
+        """Return the thread limit for each of `workers` workers."""
+        return max(1, self.total // max(1, workers))
+
+    def cpu_set(self, index, workers):
+        """Return the CPU ids worker `index` of `workers` is pinned to, or None."""
+        if not self.pin or len(self.cpus) < workers:
+            return None
+        chunk = len(self.cpus) // workers
+        return set(self.cpus[index * chunk:(index + 1) * chunk])
+
+    def apply(self, workers=1, index=None):
+        """Apply this worker's share of the budget to the current process.
+
+        Args:
+            workers: Number of workers sharing the budget
+            index: This worker's index, used for CPU pinning (None = no pinning)
+
+        Returns:
+            The per-worker thread limit that was applied
+        """
+        threads = self.threads_per_worker(workers)
+        cpu_set = self.cpu_set(index % workers, workers) if index is not None else None
+        apply_thread_limits(threads, cpu_set)
+        return threads
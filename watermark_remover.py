@@ -1,15 +1,140 @@
 """Watermark detection and removal module."""
 
+import functools
+import hashlib
+
 import cv2
 import numpy as np
-from config import WATERMARK_CONFIGS
+from config import WATERMARK_CONFIGS, WATERMARK_SEARCH_REGIONS
+
+# Neighborhood radius of cv2.inpaint
+INPAINT_RADIUS = 3
+
+# Pixels added around each detected region before inpainting
+REGION_PADDING = 5
+
+
+def _inpaint_crops(boxes, margin, width, height):
+    """Group mask boxes into disjoint crops that can be inpainted separately.
+
+    Each box is grown by `margin` (clipped to the image) and crops that
+    intersect are merged until none do, so no pixel of one crop's mask
+    is within `margin` of another crop's mask.
+
+    Returns:
+        List of (x1, y1, x2, y2) crops, each containing whole boxes
+    """
+    crops = [(max(0, x1 - margin), max(0, y1 - margin),
+              min(width, x2 + margin), min(height, y2 + margin))
+             for x1, y1, x2, y2 in boxes if x2 > x1 and y2 > y1]
+
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(crops)):
+            for j in range(i + 1, len(crops)):
+                a, b = crops[i], crops[j]
+                if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                    crops[i] = (min(a[0], b[0]), min(a[1], b[1]),
+                                max(a[2], b[2]), max(a[3], b[3]))
+                    del crops[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return crops
+
+
+class MaskTemplate:
+    """A fixed watermark mask for one image size, ready to inpaint.
+
+    The inpainting crops are worked out once when the template is built,
+    so applying it to an image needs no detection at all.
+    """
+
+    def __init__(self, mask):
+        """Initialize the template.
+
+        Args:
+            mask: uint8 array (height, width), nonzero where the watermark is
+        """
+        self.mask = mask
+        self.mask.setflags(write=False)
+        self.height, self.width = mask.shape
+
+        _, _, stats, _ = cv2.connectedComponentsWithStats(mask, connectivity=8)
+        boxes = [(x, y, x + w, y + h) for x, y, w, h in stats[1:, :4].tolist()]
+        self.crops = _inpaint_crops(boxes, INPAINT_RADIUS + 2, self.width, self.height)
+
+    @classmethod
+    def from_boxes(cls, boxes, width, height):
+        """Build a template covering pixel boxes (x1, y1, x2, y2)."""
+        mask = np.zeros((height, width), dtype=np.uint8)
+        for x1, y1, x2, y2 in boxes:
+            mask[y1:y2, x1:x2] = 255
+        return cls(mask)
+
+    @functools.cached_property
+    def digest(self):
+        """Hex digest of the mask's size and pixels, e.g. for cache keys."""
+        hasher = hashlib.blake2b(digest_size=16)
+        hasher.update(f"{self.width}x{self.height}".encode())
+        hasher.update(self.mask.tobytes())
+        return hasher.hexdigest()
+
+
+@functools.lru_cache(maxsize=128)
+def generator_template(generator, width, height):
+    """Return the fixed watermark mask of a generator at one resolution.
+
+    Built from WATERMARK_CONFIGS on first use and memoized per
+    (generator, width, height).
+
+    Args:
+        generator: Key of WATERMARK_CONFIGS, e.g. "gemini"
+        width: Image width in pixels
+        height: Image height in pixels
+
+    Returns:
+        MaskTemplate
+    """
+    if generator not in WATERMARK_CONFIGS:
+        raise ValueError(f"Unknown generator '{generator}', expected one of: "
+                         f"{', '.join(WATERMARK_CONFIGS)}")
+    config = WATERMARK_CONFIGS[generator]
+
+    box = config.get("mask_box")
+    if box is None:
+        x1, _, x2, _ = WATERMARK_SEARCH_REGIONS[config["typical_location"]]
+        box = (x1, 1.0 - config["height_ratio"], x2, 1.0)
+
+    fx1, fy1, fx2, fy2 = box
+    pixels = (int(width * fx1), int(height * fy1), int(width * fx2), int(height * fy2))
+    return MaskTemplate.from_boxes([pixels], width, height)
 
 
 class WatermarkRemover:
     """Handles detection and removal of AI tool watermarks."""
 
-    def __init__(self):
+    def __init__(self, mask_library=None):
+        """Initialize the remover.
+
+        Args:
+            mask_library: Optional MaskLibrary whose stored masks take
+                precedence over WATERMARK_CONFIGS for known generators
+        """
         self.configs = WATERMARK_CONFIGS
+        self.search_regions = WATERMARK_SEARCH_REGIONS
+        self.mask_library = mask_library
+        # Masks learned from a batch (learn_consensus), keyed by (width, height)
+        self.consensus_masks = {}
+
+    def _search_strips(self, width, height):
+        """Return the watermark search strips as pixel (x1, y1, x2, y2) boxes."""
+        return [
+            (int(width * fx1), int(height * fy1), int(width * fx2), int(height * fy2))
+            for fx1, fy1, fx2, fy2 in self.search_regions.values()
+        ]
 
     def detect_watermark_region(self, image):
         """Detect potential watermark regions in the image.
@@ -21,35 +146,56 @@ class WatermarkRemover:
             List of bounding boxes (x, y, w, h) of detected watermark regions
         """
         height, width = image.shape[:2]
-        detected_regions = []
-
-        # Convert to grayscale
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-
-        # Check common watermark locations
-        regions_to_check = [
-            ("bottom_right", (int(width * 0.7), int(height * 0.85), width, height)),
-            ("bottom_left", (0, int(height * 0.85), int(width * 0.3), height)),
-            ("bottom", (int(width * 0.3), int(height * 0.9), int(width * 0.7), height)),
-        ]
-
-        for location, (x1, y1, x2, y2) in regions_to_check:
-            roi = gray[y1:y2, x1:x2]
-
-            # Look for text-like regions (watermarks are usually text)
-            # Use edge detection to find text boundaries
-            edges = cv2.Canny(roi, 50, 150)
-
-            # Find contours
-            contours, _ = cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-
-            for contour in contours:
-                x, y, w, h = cv2.boundingRect(contour)
-                # Filter for text-like dimensions (horizontal, small height)
-                if w > 20 and h > 5 and w > h * 2:
-                    detected_regions.append((x1 + x, y1 + y, w, h))
-
-        return detected_regions
+        strips = self._search_strips(width, height)
+
+        # Only the bounding box of the strips is converted and edge-detected,
+        # so the cost follows the searched area rather than the image size
+        x0 = min(x1 for x1, _, _, _ in strips)
+        y0 = min(y1 for _, y1, _, _ in strips)
+        x_end = max(x2 for _, _, x2, _ in strips)
+        y_end = max(y2 for _, _, _, y2 in strips)
+        if x_end <= x0 or y_end <= y0:
+            return []
+
+        roi = image[y0:y_end, x0:x_end]
+        gray = cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY) if len(roi.shape) == 3 else roi
+
+        # Look for text-like regions (watermarks are usually text)
+        # Use edge detection to find text boundaries
+        edges = cv2.Canny(gray, 50, 150)
+
+        # Ignore edges in parts of the bounding box no strip covers
+        searched = np.zeros_like(edges)
+        for x1, y1, x2, y2 in strips:
+            searched[y1 - y0:y2 - y0, x1 - x0:x2 - x0] = 255
+        cv2.bitwise_and(edges, searched, dst=edges)
+
+        # Label only the area that has edges, usually just the watermark itself
+        ex, ey, ew, eh = cv2.boundingRect(edges)
+        if ew == 0 or eh == 0:
+            return []
+
+        # Each connected group of edge pixels is one candidate box
+        _, _, stats, _ = cv2.connectedComponentsWithStatsWithAlgorithm(
+            edges[ey:ey + eh, ex:ex + ew], 8, cv2.CV_32S, cv2.CCL_GRANA)
+        boxes = stats[1:, :4]  # Row 0 is the background
+        w, h = boxes[:, 2], boxes[:, 3]
+
+        # Filter for text-like dimensions (horizontal, small height)
+        boxes = boxes[(w > 20) & (h > 5) & (w > h * 2)] + (x0 + ex, y0 + ey, 0, 0)
+        return [tuple(int(v) for v in box) for box in boxes]
+
+    def _padded_boxes(self, regions, width, height):
+        """Return detected (x, y, w, h) regions as padded (x1, y1, x2, y2) boxes."""
+        boxes = []
+        for x, y, w, h in regions:
+            # Expand region slightly to ensure complete coverage
+            x = max(0, x - REGION_PADDING)
+            y = max(0, y - REGION_PADDING)
+            w = min(width - x, w + 2 * REGION_PADDING)
+            h = min(height - y, h + 2 * REGION_PADDING)
+            boxes.append((x, y, x + w, y + h))
+        return boxes
 
     def inpaint_watermark(self, image, regions):
         """Remove watermark by inpainting detected regions.
@@ -64,24 +210,75 @@ class WatermarkRemover:
         if not regions:
             return image
 
-        # Create mask for inpainting
-        mask = np.zeros(image.shape[:2], dtype=np.uint8)
+        height, width = image.shape[:2]
+        boxes = self._padded_boxes(regions, width, height)
+
+        # Inpainting only reads pixels within the radius (plus one for
+        # gradients) of the mask, so inpainting each crop with a margin of
+        # radius + 2 gives the same result as inpainting the whole frame
+        result = image.copy()
+        for cx1, cy1, cx2, cy2 in _inpaint_crops(boxes, INPAINT_RADIUS + 2, width, height):
+            mask = np.zeros((cy2 - cy1, cx2 - cx1), dtype=np.uint8)
+            for x1, y1, x2, y2 in boxes:
+                if cx1 <= x1 and x2 <= cx2 and cy1 <= y1 and y2 <= cy2:
+                    mask[y1 - cy1:y2 - cy1, x1 - cx1:x2 - cx1] = 255
+
+            # Use inpainting to remove watermark
+            result[cy1:cy2, cx1:cx2] = cv2.inpaint(image[cy1:cy2, cx1:cx2], mask,
+                                                   INPAINT_RADIUS, cv2.INPAINT_TELEA)
 
-        for x, y, w, h in regions:
-            # Expand region slightly to ensure complete coverage
-            padding = 5
-            x = max(0, x - padding)
-            y = max(0, y - padding)
-            w = min(image.shape[1] - x, w + 2 * padding)
-            h = min(image.shape[0] - y, h + 2 * padding)
+        return result
 
-            mask[y:y+h, x:x+w] = 255
+    def apply_template(self, image, template):
+        """Remove a watermark at a known position without detecting it.
 
-        # Use inpainting to remove watermark
-        result = cv2.inpaint(image, mask, 3, cv2.INPAINT_TELEA)
+        Args:
+            image: numpy array of the image (BGR format)
+            template: MaskTemplate of the image's size
 
+        Returns:
+            Image with the template area inpainted
+        """
+        if image.shape[:2] != (template.height, template.width):
+            raise ValueError(f"Mask template is {template.width}x{template.height}, "
+                             f"image is {image.shape[1]}x{image.shape[0]}")
+
+        result = image.copy()
+        for cx1, cy1, cx2, cy2 in template.crops:
+            result[cy1:cy2, cx1:cx2] = cv2.inpaint(image[cy1:cy2, cx1:cx2],
+                                                   template.mask[cy1:cy2, cx1:cx2],
+                                                   INPAINT_RADIUS, cv2.INPAINT_TELEA)
         return result
 
+    def learn_consensus(self, images, min_agreement=0.5):
+        """Combine the detections of several same-sized images into one mask.
+
+        Every image votes for the pixels it would inpaint; pixels chosen by
+        more than `min_agreement` of the images form the consensus mask, so
+        a watermark present in most images is kept while detections that
+        only appear in a few (image content) are dropped.
+
+        Args:
+            images: numpy arrays (BGR format), all of the same size
+            min_agreement: Fraction of the images a pixel must exceed
+
+        Returns:
+            MaskTemplate (empty if the images agree on no watermark)
+        """
+        height, width = images[0].shape[:2]
+        votes = np.zeros((height, width), dtype=np.uint16)
+        for image in images:
+            if image.shape[:2] != (height, width):
+                raise ValueError("Consensus images must all have the same size")
+            voted = np.zeros((height, width), dtype=np.uint8)
+            for x1, y1, x2, y2 in self._padded_boxes(self.detect_watermark_region(image),
+                                                     width, height):
+                voted[y1:y2, x1:x2] = 1
+            votes += voted
+
+        mask = np.where(votes > len(images) * min_agreement, 255, 0).astype(np.uint8)
+        return MaskTemplate(mask)
+
     def remove_bottom_region(self, image, height_ratio=0.15):
         """Remove watermark by cropping bottom region of image.
 
@@ -98,16 +295,54 @@ class WatermarkRemover:
         crop_height = int(height * (1 - height_ratio))
         return image[:crop_height, :]
 
-    def smart_remove(self, image, aggressive=False):
+    def generator_mask(self, generator, width, height):
+        """Return a generator's mask at one size, from the library if it has one.
+
+        Returns:
+            MaskTemplate (stored in the mask library, else from WATERMARK_CONFIGS)
+        """
+        if self.mask_library is not None:
+            template = self.mask_library.get(generator, width, height)
+            if template is not None:
+                return template
+        return generator_template(generator, width, height)
+
+    def select_template(self, width, height, generator=None, consensus=False):
+        """Return the mask smart_remove inpaints at one image size.
+
+        Returns:
+            MaskTemplate, or None if the image's watermarks are detected
+        """
+        template = self.consensus_masks.get((width, height)) if consensus else None
+        if template is None and generator:
+            template = self.generator_mask(generator, width, height)
+        return template
+
+    def smart_remove(self, image, aggressive=False, generator=None, consensus=False):
         """Intelligently remove watermarks using detection and inpainting.
 
         Args:
             image: numpy array of the image (BGR format)
             aggressive: If True, also crop bottom region as fallback
+            generator: Known source (key of WATERMARK_CONFIGS); skips
+                detection and inpaints that generator's mask (see
+                generator_mask)
+            consensus: Inpaint the mask learned for the image's size (see
+                consensus_masks) instead of detecting; sizes without one
+                use the generator's mask or are detected as usual
 
         Returns:
             Image with watermarks removed
         """
+        height, width = image.shape[:2]
+        template = self.select_template(width, height, generator, consensus)
+
+        if template is not None:
+            result = self.apply_template(image, template)
+            if aggressive:
+                result = self.remove_bottom_region(result, height_ratio=0.12)
+            return result
+
         # First try to detect and inpaint specific watermark regions
         regions = self.detect_watermark_region(image)
 